@@ -1,10 +1,77 @@
 import pulumi
-import pulumi_aws as aws
 
+from lib import tracing
 from lib.vpc import Vpc
 from lib.ping_instance import PingInstance
 from lib.encrypted_bucket import EncryptedBucket
 from lib.aurora_postgres import AuroraPostgres
+from lib.ip_plan import assign_region_cidrs
+
+
+def deploy_regions(namespace, environment, name, regions, reserved_cidrs):
+    from pulumi_aws import Provider
+
+    # Regions without an explicit vpcCidr get a /16 keyed by region name, so it never moves with the list
+    vpc_cidrs = assign_region_cidrs(
+        [entry["region"] for entry in regions],
+        {entry["region"]: entry["vpcCidr"] for entry in regions if entry.get("vpcCidr")},
+        "10.0.0.0/8", 16, reserved_cidrs,
+    )
+
+    regional_outputs = {}
+    for entry in regions:
+        region = entry["region"]
+        vpc_cidr = vpc_cidrs[region]
+        regional_name = f"{name}-{region}"
+
+        # Explicit provider per region, inherited by every child of the components below
+        provider = Provider(f"aws-{region}", region=region)
+        opts = pulumi.ResourceOptions(providers={"aws": provider})
+
+        vpc = Vpc(f"vpc-{region}", {
+            "namespace": namespace,
+            "environment": environment,
+            "name": regional_name,
+            "region": region,
+            "cidr": vpc_cidr,
+            "private_app_subnets": True,
+            "isolated_data_subnets": True,
+            "interface_endpoints": entry.get("interfaceEndpoints", ["kms", "logs", "rds", "sts"]),
+        }, opts)
+
+        s3_bucket = EncryptedBucket(f"encrypted-bucket-{region}", {
+            "namespace": namespace,
+            "environment": environment,
+            "name": regional_name,
+            "vpce_id": vpc.s3_endpoint_id,
+        }, opts)
+
+        db = AuroraPostgres(f"postgres-{region}", {
+            "namespace": namespace,
+            "environment": environment,
+            "name": regional_name,
+            "db_instance_class": entry.get("dbInstanceClass", "db.t4g.medium"),
+            "version": entry.get("dbVersion", "16.4"),
+            "vpc_id": vpc.vpc_id,
+            "vpc_cidr": vpc_cidr,
+            "subnet_ids": vpc.isolated_subnet_ids,
+            "s3_bucket_arn": s3_bucket.bucket_arn,
+            "s3_kms_key_arn": s3_bucket.kms_key_arn,
+            "s3_prefix_list_id": vpc.s3_prefix_list_id,
+        }, opts)
+
+        regional_outputs[region] = {
+            "vpc_id": vpc.vpc_id,
+            "vpc_cidr": vpc_cidr,
+            "private_subnet_ids": vpc.private_subnet_ids,
+            "isolated_subnet_ids": vpc.isolated_subnet_ids,
+            "bucket_name": s3_bucket.bucket_name,
+            "bucket_arn": s3_bucket.bucket_arn,
+            "db_cluster_endpoint": db.cluster_endpoint,
+            "db_cluster_port": db.cluster_port,
+        }
+
+    pulumi.export("regions", regional_outputs)
 
 
 def main():
@@ -15,6 +82,21 @@ def main():
     name = config.require("name")
     base_name = f"{namespace}-{environment}-{name}"
 
+    # Optionally record component construction and apply timings as a Chrome/speedscope trace
+    trace_file = config.get("traceFile")
+    if trace_file:
+        tracing.enable(trace_file)
+
+    # Multi-region mode, deploy the VPC, bucket and database into every configured region
+    regions = config.get_object("regions")
+    if regions:
+        # Never allocate the OpenVPN VPC's CIDR or the stack's own single-region one
+        reserved_cidrs = config.get_object("reservedCidrs") or []
+        if config.get("vpcCidr"):
+            reserved_cidrs.append(config.get("vpcCidr"))
+        deploy_regions(namespace, environment, name, regions, reserved_cidrs)
+        return
+
     ######
     # Step 1
     #
@@ -25,7 +107,8 @@ def main():
     # vpc_cidr = config.require("vpcCidr")
 
     # # Get the current AWS region
-    # region = aws.get_region().name
+    # from pulumi_aws import get_region
+    # region = get_region().name
 
     # # Reference bootstrapping stack
     # open_vpn_stack = pulumi.StackReference(config.require("openVpnStack"))
@@ -46,6 +129,14 @@ def main():
     # Also uncomment outputs labeled 'VPC Outputs' at the bottom
     ######
 
+    # # Optional bucket for VPC flow logs (Parquet, hourly partitions, queryable via Glue/Athena)
+    # flow_logs_bucket = EncryptedBucket("flow-logs-bucket", {
+    #     "namespace": namespace,
+    #     "environment": environment,
+    #     "name": f"{name}-flow-logs",
+    #     "allow_log_delivery": True,
+    # })
+
     # Create VPC
     # vpc = Vpc("vpc", {
     #     # Context info
@@ -58,11 +149,25 @@ def main():
     #     "private_app_subnets": True,
     #     "isolated_data_subnets": True,
 
+    #     # One NAT gateway per AZ instead of a single shared one, once public subnets are enabled
+    #     # "nat_gateway_strategy": "ONE_PER_AZ",
+
+    #     # Optional explicit subnet sizing (CIDR mask per tier), checked against the VPC CIDR at preview time
+    #     # "availability_zone_count": 3,
+    #     # "subnet_sizes": {"private-app": 19, "isolated-data": 22},
+    #     # "report_ip_plan": True,
+
     #     # OpenVPN VPC for peering configuration
     #     "open_vpn_vpc_id": open_vpn_vpc_id,
     #     "open_vpn_vpc_cidr": open_vpn_vpc_cidr,
     #     "open_vpn_vpc_rtbls": open_vpn_vpc_rtbls,
 
+    #     # Alternatively, attach to the bootstrap stack's transit gateway instead of peering
+    #     # "transit_gateway_id": open_vpn_stack.get_output("transitGatewayId"),
+    #     # "transit_gateway_cidrs": ["10.0.0.0/8"],
+    #     # "transit_gateway_route_table_id": open_vpn_stack.get_output("transitGatewaySpokeRouteTableId"),
+    #     # "transit_gateway_propagation_route_table_ids": [open_vpn_stack.get_output("transitGatewayHubRouteTableId")],
+
     #     # VPC interface endpoint configuration
     #     # AWS region (convenience for interface endpoint definitions)
     #     "region": region,
@@ -77,7 +182,23 @@ def main():
     #         "ec2messages",
     #         "ssm",
     #         "ssmmessages",
-    #     ]
+    #     ],
+
+    #     # Subnet tier for interface endpoint ENIs: "isolated-data" (default), "private-app", "private-data" or "public"
+    #     # "interface_endpoint_subnets": "private-app",
+
+    #     # Reuse endpoints hosted by the bootstrap stack instead of creating them here
+    #     # (service -> private hosted zone id); listed services are skipped above
+    #     # "shared_interface_endpoints": {
+    #     #     "kms": open_vpn_stack.get_output("kmsEndpointZoneId"),
+    #     #     "sts": open_vpn_stack.get_output("stsEndpointZoneId"),
+    #     # },
+
+    #     # NAT gateway and interface endpoint alarms and dashboard
+    #     # "monitoring": True,
+
+    #     # VPC flow logs delivery
+    #     # "flow_logs_bucket_arn": flow_logs_bucket.bucket_arn,
     # })
 
     # private_app_subnet_id = vpc.private_subnet_ids.apply(lambda ids: ids[0])
@@ -169,7 +290,23 @@ def main():
 
     #     "vpc_id": vpc.vpc_id,
     #     "vpc_cidr": vpc_cidr,
-    #     "subnet_ids": vpc.isolated_subnet_ids
+    #     "subnet_ids": vpc.isolated_subnet_ids,
+
+    #     # Server-side bulk load/unload from the encrypted bucket through the S3 gateway endpoint
+    #     # "s3_bucket_arn": s3_bucket.bucket_arn,
+    #     # "s3_kms_key_arn": s3_bucket.kms_key_arn,
+    #     # "s3_prefix_list_id": vpc.s3_prefix_list_id,
+
+    #     # Stage engine/parameter/instance changes on a green environment, set switchover to cut over.
+    #     # Enable logical replication and reboot the writer in an earlier `pulumi up` (see README)
+    #     # "logical_replication": True,
+    #     # "blue_green": {
+    #     #     "version": "16.6",
+    #     #     "db_instance_class": "db.r7g.large",
+    #     #     "cluster_parameters": [{"name": "shared_preload_libraries", "value": "pg_stat_statements", "apply_method": "pending-reboot"}],
+    #     #     "switchover": False,
+    #     #     "switchover_timeout": 300,
+    #     # },
     # })
 
     ######
@@ -201,6 +338,10 @@ def main():
     # pulumi.export("db_cluster_endpoint", db.cluster_endpoint)
     # pulumi.export("db_admin_user", db.admin_user)
     # pulumi.export("db_admin_password", db.admin_password)
+    # pulumi.export("db_s3_role_arn", db.s3_role_arn)
+    # pulumi.export("db_s3_import_sql", db.s3_import_sql)
+    # pulumi.export("db_blue_green_status", db.blue_green_status)
+    # pulumi.export("db_green_endpoint", db.green_endpoint)
 
 
 if __name__ == "__main__":
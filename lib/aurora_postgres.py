@@ -1,11 +1,17 @@
 import pulumi
-import pulumi_aws as aws
-import pulumi_random as random
+import json
 from typing import Optional, Dict, Any
 
+from lib.blue_green import AuroraBlueGreenDeployment
+from lib.tracing import traced
 
+
+@traced
 class AuroraPostgres(pulumi.ComponentResource):
     def __init__(self, name: str, args: Dict[str, Any], opts: Optional[pulumi.ResourceOptions] = None):
+        from pulumi_aws import ec2, get_region, iam, kms, rds
+        from pulumi_random import RandomPassword
+
         super().__init__("huckstream:aws:postgres", name, {}, opts)
 
         # Set context details
@@ -35,7 +41,7 @@ class AuroraPostgres(pulumi.ComponentResource):
         self.port = args.get("port", 5432)
 
         # Create a KMS Key
-        kms_key = aws.kms.Key(f"{self.base_name}-kms-key",
+        kms_key = kms.Key(f"{self.base_name}-kms-key",
             description=f"KMS key for Aurora PostgreSQL encryption of database {self.base_name}",
             deletion_window_in_days=14,
             tags=base_tags,
@@ -43,7 +49,7 @@ class AuroraPostgres(pulumi.ComponentResource):
         )
 
         # Create a KMS Alias
-        kms_alias = aws.kms.Alias(self.base_name,
+        kms_alias = kms.Alias(self.base_name,
             name=f"alias/{self.base_name}",
             target_key_id=kms_key.key_id,
             opts=pulumi.ResourceOptions(parent=self)
@@ -55,7 +61,7 @@ class AuroraPostgres(pulumi.ComponentResource):
 
         # Create a DB subnet group
         subnet_group_name = f"{self.base_name}-subnet-group"
-        subnet_group = aws.rds.SubnetGroup(subnet_group_name,
+        subnet_group = rds.SubnetGroup(subnet_group_name,
             name=subnet_group_name,
             description=f"Subnet group for Aurora Postgres cluster {self.base_name}",
             subnet_ids=subnet_ids,
@@ -68,12 +74,12 @@ class AuroraPostgres(pulumi.ComponentResource):
 
         # Create a security group
         sg_name = f"{self.base_name}-sg"
-        sg = aws.ec2.SecurityGroup(sg_name,
+        sg = ec2.SecurityGroup(sg_name,
             name=sg_name,
             description=f"Network permissions for Aurora Postgres cluster {self.base_name}",
             vpc_id=vpc_id,
             ingress=[
-                aws.ec2.SecurityGroupIngressArgs(
+                ec2.SecurityGroupIngressArgs(
                     description="Allow private local ingress",
                     protocol="tcp",
                     from_port=self.port,
@@ -82,14 +88,22 @@ class AuroraPostgres(pulumi.ComponentResource):
                 ),
             ],
             egress=[
-                aws.ec2.SecurityGroupEgressArgs(
+                ec2.SecurityGroupEgressArgs(
                     description="Allow private local egress",
                     protocol="-1",
                     from_port=0,
                     to_port=0,
                     cidr_blocks=[vpc_cidr],  # Allow all Postgres traffic on local private subnets
                 ),
-            ],
+            ] + ([
+                ec2.SecurityGroupEgressArgs(
+                    description="Allow S3 bulk load/unload through the gateway endpoint",
+                    protocol="tcp",
+                    from_port=443,
+                    to_port=443,
+                    prefix_list_ids=[args["s3_prefix_list_id"]],
+                ),
+            ] if args.get("s3_prefix_list_id") else []),
             tags={
                 **base_tags,
                 "Name": sg_name
@@ -97,15 +111,30 @@ class AuroraPostgres(pulumi.ComponentResource):
             opts=pulumi.ResourceOptions(parent=self)
         )
 
+        # PostgreSQL blue/green replicates through logical replication, which only takes effect once the writer
+        # reboots, so it is enabled (and the writer rebooted) before blue_green is set
+        logical_replication = args.get("logical_replication", False)
+        blue_green = args.get("blue_green")
+        if blue_green and not logical_replication:
+            raise ValueError("blue_green requires logical_replication, enable it and reboot the writer first")
+
+        logical_replication_parameters = [
+            rds.ClusterParameterGroupParameterArgs(
+                name="rds.logical_replication",
+                value="1",
+                apply_method="pending-reboot",
+            ),
+        ] if logical_replication else []
+
         # Create a cluster parameter group
         cluster_parameter_group_name = f"{self.base_name}-cpg"
-        cluster_parameter_group = aws.rds.ClusterParameterGroup(cluster_parameter_group_name,
+        cluster_parameter_group = rds.ClusterParameterGroup(cluster_parameter_group_name,
             name=cluster_parameter_group_name,
             family=f"aurora-postgresql{self.major_engine_version}",
             description=f"Cluster parameter group for {self.base_name}",
             parameters=[
                 # Override Aurora Postgres Default cluster db parameters here
-            ],
+            ] + logical_replication_parameters,
             tags={
                 **base_tags,
                 "Name": cluster_parameter_group_name
@@ -115,7 +144,7 @@ class AuroraPostgres(pulumi.ComponentResource):
 
         # Create a DB parameter group
         parameter_group_name = f"{self.base_name}-pg"
-        parameter_group = aws.rds.ParameterGroup(parameter_group_name,
+        parameter_group = rds.ParameterGroup(parameter_group_name,
             name=parameter_group_name,
             family=f"aurora-postgresql{self.major_engine_version}",
             description=f"Cluster instance parameter group for {self.base_name}",
@@ -129,8 +158,52 @@ class AuroraPostgres(pulumi.ComponentResource):
             opts=pulumi.ResourceOptions(parent=self)
         )
 
+        # Blue/Green target parameter groups. After switchover production runs on them (and the green engine
+        # version and instance class) under the original identifiers, so they stay managed while blue_green is set
+        green_cluster_parameter_group = None
+        green_parameter_group = None
+        switched_over = bool(blue_green and blue_green.get("switchover"))
+
+        if blue_green:
+            green_engine_version = blue_green.get("version", self.engine_version)
+            green_instance_class = blue_green.get("db_instance_class", args["db_instance_class"])
+
+            green_family = f"aurora-postgresql{green_engine_version.split('.')[0]}"
+
+            green_cluster_parameter_group_name = f"{self.base_name}-green-cpg"
+            green_cluster_parameter_group = rds.ClusterParameterGroup(green_cluster_parameter_group_name,
+                name=green_cluster_parameter_group_name,
+                family=green_family,
+                description=f"Green cluster parameter group for {self.base_name}",
+                parameters=[
+                    rds.ClusterParameterGroupParameterArgs(**parameter)
+                    for parameter in blue_green.get("cluster_parameters", [])
+                ] + logical_replication_parameters,
+                tags={
+                    **base_tags,
+                    "Name": green_cluster_parameter_group_name
+                },
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+            green_parameter_group_name = f"{self.base_name}-green-pg"
+            green_parameter_group = rds.ParameterGroup(green_parameter_group_name,
+                name=green_parameter_group_name,
+                family=green_family,
+                description=f"Green cluster instance parameter group for {self.base_name}",
+                parameters=[
+                    rds.ParameterGroupParameterArgs(**parameter)
+                    for parameter in blue_green.get("parameters", [])
+                ],
+                tags={
+                    **base_tags,
+                    "Name": green_parameter_group_name
+                },
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
         # Generate admin creds
-        db_password = random.RandomPassword(f"{self.base_name}-pwd",
+        db_password = RandomPassword(f"{self.base_name}-pwd",
             length=32,
             special=False,
             numeric=True,
@@ -146,14 +219,14 @@ class AuroraPostgres(pulumi.ComponentResource):
         db_user = f"{self.namespace}admin".lower().replace("-", "")
 
         # Create an Aurora PostgreSQL cluster
-        self.cluster = aws.rds.Cluster(f"{self.base_name}-cluster",
+        self.cluster = rds.Cluster(f"{self.base_name}-cluster",
             # Cluster name
             cluster_identifier=self.base_name,
 
             # Engine config
             engine="aurora-postgresql",
-            engine_version=self.engine_version,
-            db_cluster_parameter_group_name=cluster_parameter_group.name,
+            engine_version=green_engine_version if switched_over else self.engine_version,
+            db_cluster_parameter_group_name=(green_cluster_parameter_group if switched_over else cluster_parameter_group).name,
 
             # Admin password
             master_username=db_user,
@@ -182,7 +255,11 @@ class AuroraPostgres(pulumi.ComponentResource):
 
             # Set tags
             tags=base_tags,
-            opts=pulumi.ResourceOptions(parent=self)
+            # The switchover moves these, never apply them to the blue cluster ahead of it
+            opts=pulumi.ResourceOptions(
+                parent=self,
+                ignore_changes=["engine_version", "db_cluster_parameter_group_name"] if switched_over else None,
+            )
         )
 
         self.cluster_name = pulumi.Output.from_input(self.base_name)
@@ -198,7 +275,7 @@ class AuroraPostgres(pulumi.ComponentResource):
         # Create two instances for HA
         for i in range(2):
             instance_name = f"{self.base_name}-instance-{i}"
-            instance = aws.rds.ClusterInstance(instance_name,
+            instance = rds.ClusterInstance(instance_name,
                 # Instance name
                 identifier=instance_name,
 
@@ -207,12 +284,13 @@ class AuroraPostgres(pulumi.ComponentResource):
 
                 # Engine config
                 engine="aurora-postgresql",
-                engine_version=self.engine_version,
+                engine_version=green_engine_version if switched_over else self.engine_version,
+                db_parameter_group_name=green_parameter_group.name if switched_over else None,
 
                 # Change management
                 apply_immediately=False,
                 auto_minor_version_upgrade=False,
-                instance_class=args["db_instance_class"],
+                instance_class=green_instance_class if switched_over else args["db_instance_class"],
 
                 # Backups
                 copy_tags_to_snapshot=True,
@@ -222,10 +300,133 @@ class AuroraPostgres(pulumi.ComponentResource):
 
                 # Set tags
                 tags=base_tags,
-                opts=pulumi.ResourceOptions(parent=self)
+                opts=pulumi.ResourceOptions(
+                    parent=self,
+                    ignore_changes=["engine_version", "db_parameter_group_name", "instance_class"] if switched_over else None,
+                )
             )
             self.instances.append(instance)
 
+        # Blue/Green deployment, stage engine/parameter/instance changes on a green copy of the cluster
+        self.blue_green_status = None
+        self.green_endpoint = None
+
+        if blue_green:
+            blue_green_deployment = AuroraBlueGreenDeployment(f"{self.base_name}-blue-green", {
+                "name": f"{self.base_name}-blue-green",
+                "region": get_region(opts=pulumi.InvokeOptions(parent=self)).name,
+                "source_arn": self.cluster.arn,
+                "target_engine_version": green_engine_version,
+                "target_cluster_parameter_group_name": green_cluster_parameter_group.name,
+                "target_parameter_group_name": green_parameter_group.name,
+                "target_instance_class": green_instance_class,
+                # Ignored by the cluster after switchover, recorded so the deployment can reject changes to them
+                "source_engine_version": self.engine_version,
+                "source_instance_class": args["db_instance_class"],
+                "switchover": blue_green.get("switchover", False),
+                "switchover_timeout": blue_green.get("switchover_timeout", 300),
+            }, opts=pulumi.ResourceOptions(parent=self, depends_on=[cluster_parameter_group, *self.instances]))
+
+            self.blue_green_status = blue_green_deployment.status
+            self.green_endpoint = blue_green_deployment.green_endpoint
+
+        # S3 integration for server-side bulk load/unload with the aws_s3 extension
+        self.s3_role_arn = None
+        self.s3_import_sql = None
+
+        if args.get("s3_bucket_arn"):
+            s3_role_name = f"{self.base_name}-s3"
+            s3_role = iam.Role(s3_role_name,
+                name=s3_role_name,
+                description=f"S3 import/export for Aurora Postgres cluster {self.base_name}",
+                assume_role_policy=self.cluster.arn.apply(lambda cluster_arn: json.dumps({
+                    "Version": "2012-10-17",
+                    "Statement": [
+                        {
+                            "Effect": "Allow",
+                            "Principal": {"Service": "rds.amazonaws.com"},
+                            "Action": "sts:AssumeRole",
+                            "Condition": {
+                                "StringEquals": {
+                                    "aws:SourceArn": cluster_arn,
+                                },
+                            },
+                        },
+                    ],
+                })),
+                tags={
+                    **base_tags,
+                    "Name": s3_role_name
+                },
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+            # Scope the role to the bucket and, if encrypted with a CMK, its KMS key
+            def create_s3_policy(bucket_arn_and_key_arn):
+                bucket_arn, bucket_kms_key_arn = bucket_arn_and_key_arn
+                statements = [
+                    {
+                        "Effect": "Allow",
+                        "Action": [
+                            "s3:GetObject",
+                            "s3:PutObject",
+                            "s3:AbortMultipartUpload",
+                        ],
+                        "Resource": f"{bucket_arn}/*",
+                    },
+                    {
+                        "Effect": "Allow",
+                        "Action": ["s3:ListBucket", "s3:GetBucketLocation"],
+                        "Resource": bucket_arn,
+                    },
+                ]
+                if bucket_kms_key_arn:
+                    statements.append({
+                        "Effect": "Allow",
+                        "Action": ["kms:Decrypt", "kms:GenerateDataKey"],
+                        "Resource": bucket_kms_key_arn,
+                    })
+
+                return json.dumps({
+                    "Version": "2012-10-17",
+                    "Statement": statements,
+                })
+
+            iam.RolePolicy(s3_role_name,
+                role=s3_role.id,
+                policy=pulumi.Output.all(args["s3_bucket_arn"], args.get("s3_kms_key_arn")).apply(create_s3_policy),
+                opts=pulumi.ResourceOptions(parent=s3_role)
+            )
+
+            # Associate the role with the cluster for each feature, s3Export is on by default. RDS rejects
+            # concurrent role changes on one cluster, so each association waits for the previous one
+            s3_features = ["s3Import", "s3Export"] if args.get("s3_export", True) else ["s3Import"]
+            previous_association = None
+            for feature in s3_features:
+                previous_association = rds.ClusterRoleAssociation(f"{self.base_name}-{feature.lower()}",
+                    db_cluster_identifier=self.cluster.id,
+                    feature_name=feature,
+                    role_arn=s3_role.arn,
+                    opts=pulumi.ResourceOptions(
+                        parent=self,
+                        depends_on=[previous_association] if previous_association else None,
+                    )
+                )
+
+            self.s3_role_arn = s3_role.arn
+
+            # Statements to run as the admin user to bulk load a CSV object with server-side COPY
+            region = get_region(opts=pulumi.InvokeOptions(parent=self)).name
+            self.s3_import_sql = pulumi.Output.from_input(args["s3_bucket_arn"]).apply(
+                lambda bucket_arn: "\n".join([
+                    "CREATE EXTENSION IF NOT EXISTS aws_s3 CASCADE;",
+                    "SELECT aws_s3.table_import_from_s3(",
+                    "    '<table>', '', '(format csv, header true)',",
+                    f"    aws_commons.create_s3_uri('{bucket_arn.split(':::')[-1]}', '<key>', '{region}')",
+                    ");",
+                ])
+            )
+
         # Register the outputs
         self.register_outputs({
             "kms_key_id": self.kms_key_id,
@@ -236,4 +437,8 @@ class AuroraPostgres(pulumi.ComponentResource):
             "cluster_endpoint": self.cluster_endpoint,
             "admin_user": self.admin_user,
             "admin_password": self.admin_password,
+            "s3_role_arn": self.s3_role_arn,
+            "s3_import_sql": self.s3_import_sql,
+            "blue_green_status": self.blue_green_status,
+            "green_endpoint": self.green_endpoint,
         })
\ No newline at end of file
@@ -0,0 +1,224 @@
+import json
+import subprocess
+import time
+from typing import Optional, Dict, Any
+
+import pulumi
+import pulumi.dynamic
+
+
+# Properties whose change requires staging a new green environment
+_REPLACE_PROPERTIES = [
+    "source_arn",
+    "target_engine_version",
+    "target_cluster_parameter_group_name",
+    "target_parameter_group_name",
+    "target_instance_class",
+]
+
+# Source cluster settings, only recorded to detect changes after switchover
+_SOURCE_PROPERTIES = [
+    "source_engine_version",
+    "source_instance_class",
+]
+
+
+def _rds(region: str, *args: str) -> Dict[str, Any]:
+    # pulumi-aws has no Aurora blue/green resource, so drive the RDS API through the AWS CLI
+    # (already required for the workshop's SSO login) rather than adding an SDK dependency
+    completed = subprocess.run(
+        ["aws", "rds", *args, "--region", region, "--output", "json"],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"aws rds {args[0]} failed: {completed.stderr.strip()}")
+    return json.loads(completed.stdout) if completed.stdout.strip() else {}
+
+
+def _find(region: str, filter_name: str, value: str) -> Optional[Dict[str, Any]]:
+    # Filtering returns an empty list for a missing deployment, where --blue-green-deployment-identifier
+    # fails with BlueGreenDeploymentNotFoundFault
+    deployments = _rds(region, "describe-blue-green-deployments",
+                       "--filters", f"Name={filter_name},Values={value}")["BlueGreenDeployments"]
+    return deployments[0] if deployments else None
+
+
+def _describe(region: str, identifier: str) -> Dict[str, Any]:
+    deployment = _find(region, "blue-green-deployment-identifier", identifier)
+    if deployment is None:
+        raise RuntimeError(f"Blue/Green deployment {identifier} no longer exists, it was deleted outside Pulumi. "
+                           f"Remove it from the stack with `pulumi state delete` and run `pulumi up` again")
+    return deployment
+
+
+def _wait_for_status(region: str, identifier: str, statuses, timeout: int) -> Dict[str, Any]:
+    deadline = time.monotonic() + timeout
+    while True:
+        deployment = _describe(region, identifier)
+        if deployment["Status"] in statuses:
+            return deployment
+        if deployment["Status"] in ("INVALID_CONFIGURATION", "SWITCHOVER_FAILED", "PROVISIONING_FAILED"):
+            raise RuntimeError(f"Blue/Green deployment {identifier} is {deployment['Status']}: "
+                               f"{deployment.get('StatusDetails', '')}")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Blue/Green deployment {identifier} still {deployment['Status']} after {timeout}s")
+        time.sleep(30)
+
+
+def _check_logical_replication(region: str, source_arn: str):
+    # create-blue-green-deployment fails unless the source cluster runs with logical replication enabled
+    cluster = _rds(region, "describe-db-clusters", "--filters", f"Name=db-cluster-id,Values={source_arn}")["DBClusters"][0]
+    parameters = _rds(region, "describe-db-cluster-parameters",
+                      "--db-cluster-parameter-group-name", cluster["DBClusterParameterGroup"],
+                      "--source", "user")["Parameters"]
+
+    enabled = any(parameter["ParameterName"] == "rds.logical_replication" and parameter.get("ParameterValue") == "1"
+                  for parameter in parameters)
+    pending_reboot = [member["DBInstanceIdentifier"] for member in cluster["DBClusterMembers"]
+                      if member["DBClusterParameterGroupStatus"] != "in-sync"]
+
+    if not enabled:
+        raise RuntimeError(f"rds.logical_replication is not enabled in {cluster['DBClusterParameterGroup']}, "
+                           f"set logical_replication on the database first")
+    if pending_reboot:
+        raise RuntimeError(f"Cluster parameter changes are pending a reboot on {', '.join(pending_reboot)}, "
+                           f"reboot them (aws rds reboot-db-instance) before creating the blue/green deployment")
+
+
+def _outputs(region: str, props: Dict[str, Any], deployment: Dict[str, Any]) -> Dict[str, Any]:
+    green_endpoint = None
+    if deployment["Status"] != "SWITCHOVER_COMPLETED":
+        clusters = _rds(region, "describe-db-clusters",
+                        "--filters", f"Name=db-cluster-id,Values={deployment['Target']}")["DBClusters"]
+        green_endpoint = clusters[0]["Endpoint"] if clusters else None
+
+    return {
+        **props,
+        "status": deployment["Status"],
+        "target_arn": deployment["Target"],
+        "green_endpoint": green_endpoint,
+    }
+
+
+def _wait_for_switchover(region: str, identifier: str, timeout: int) -> Dict[str, Any]:
+    # Allow for provisioning of the switchover itself on top of the guardrail timeout
+    return _wait_for_status(region, identifier, ["SWITCHOVER_COMPLETED"], timeout + 1800)
+
+
+def _converge(region: str, identifier: str, props: Dict[str, Any]) -> Dict[str, Any]:
+    # Pick up from whatever state an earlier, interrupted run left the deployment in
+    deployment = _describe(region, identifier)
+    if deployment["Status"] == "SWITCHOVER_COMPLETED":
+        return deployment
+    if deployment["Status"] == "SWITCHOVER_IN_PROGRESS":
+        return _wait_for_switchover(region, identifier, props["switchover_timeout"])
+
+    deployment = _wait_for_status(region, identifier, ["AVAILABLE"], props["provision_timeout"])
+    if props.get("switchover"):
+        _rds(region, "switchover-blue-green-deployment",
+             "--blue-green-deployment-identifier", identifier,
+             "--switchover-timeout", str(props["switchover_timeout"]))
+        deployment = _wait_for_switchover(region, identifier, props["switchover_timeout"])
+    return deployment
+
+
+class _BlueGreenProvider(pulumi.dynamic.ResourceProvider):
+    def create(self, props):
+        region = props["region"]
+
+        # A create that timed out or failed after RDS accepted it never reached the state file, adopt the
+        # deployment by name instead of orphaning its green cluster and colliding with it
+        existing = _find(region, "blue-green-deployment-name", props["name"])
+        if existing is not None:
+            if existing["Status"] == "DELETING":
+                raise RuntimeError(f"Blue/Green deployment {props['name']} is still being deleted, retry once it is gone")
+            identifier = existing["BlueGreenDeploymentIdentifier"]
+        else:
+            _check_logical_replication(region, props["source_arn"])
+
+            create_args = [
+                "create-blue-green-deployment",
+                "--blue-green-deployment-name", props["name"],
+                "--source", props["source_arn"],
+            ]
+            if props.get("target_engine_version"):
+                create_args += ["--target-engine-version", props["target_engine_version"]]
+            if props.get("target_cluster_parameter_group_name"):
+                create_args += ["--target-db-cluster-parameter-group-name", props["target_cluster_parameter_group_name"]]
+            if props.get("target_parameter_group_name"):
+                create_args += ["--target-db-parameter-group-name", props["target_parameter_group_name"]]
+            if props.get("target_instance_class"):
+                create_args += ["--target-db-instance-class", props["target_instance_class"]]
+
+            identifier = _rds(region, *create_args)["BlueGreenDeployment"]["BlueGreenDeploymentIdentifier"]
+
+        return pulumi.dynamic.CreateResult(id_=identifier, outs=_outputs(region, props, _converge(region, identifier, props)))
+
+    def diff(self, id, olds, news):
+        replaces = [key for key in _REPLACE_PROPERTIES if olds.get(key) != news.get(key)]
+
+        # Production now runs the target settings and parameter groups, a new deployment would replace them under
+        # it and the cluster no longer applies the source settings, so refuse rather than silently ignore changes
+        if olds.get("status") == "SWITCHOVER_COMPLETED":
+            frozen = replaces + [key for key in _SOURCE_PROPERTIES
+                                 if olds.get(key) is not None and olds.get(key) != news.get(key)]
+            if frozen:
+                raise ValueError(f"Blue/Green deployment {olds['name']} has switched over, changing "
+                                 f"{', '.join(frozen)} after switchover is not supported")
+
+        changes = replaces or any(olds.get(key) != news.get(key)
+                                  for key in ["switchover", "switchover_timeout"] + _SOURCE_PROPERTIES)
+        return pulumi.dynamic.DiffResult(changes=bool(changes), replaces=replaces, delete_before_replace=True)
+
+    def update(self, id, olds, news):
+        region = news["region"]
+
+        # Switchover is one-way, turning it back off only stops future switchovers
+        return pulumi.dynamic.UpdateResult(outs=_outputs(region, news, _converge(region, id, news)))
+
+    def delete(self, id, props):
+        region = props["region"]
+        deployment = _find(region, "blue-green-deployment-identifier", id)
+        if deployment is None:
+            # Already deleted outside Pulumi
+            return
+
+        # Before switchover the green cluster is disposable; afterwards it is production and only the
+        # blue/green record (plus the old blue cluster, left for manual cleanup) goes away
+        delete_args = ["delete-blue-green-deployment", "--blue-green-deployment-identifier", id]
+        if deployment["Status"] != "SWITCHOVER_COMPLETED":
+            delete_args.append("--delete-target")
+        _rds(region, *delete_args)
+
+        # Replacements delete first, wait until the name is free again
+        deadline = time.monotonic() + 1800
+        while _find(region, "blue-green-deployment-name", props["name"]) is not None:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Blue/Green deployment {id} still deleting after 1800s")
+            time.sleep(30)
+
+
+class AuroraBlueGreenDeployment(pulumi.dynamic.Resource):
+    status: pulumi.Output[str]
+    target_arn: pulumi.Output[str]
+    green_endpoint: pulumi.Output[Optional[str]]
+
+    def __init__(self, name: str, args: Dict[str, Any], opts: Optional[pulumi.ResourceOptions] = None):
+        super().__init__(_BlueGreenProvider(), name, {
+            "name": args["name"],
+            "region": args["region"],
+            "source_arn": args["source_arn"],
+            "target_engine_version": args.get("target_engine_version"),
+            "target_cluster_parameter_group_name": args.get("target_cluster_parameter_group_name"),
+            "target_parameter_group_name": args.get("target_parameter_group_name"),
+            "target_instance_class": args.get("target_instance_class"),
+            "source_engine_version": args.get("source_engine_version"),
+            "source_instance_class": args.get("source_instance_class"),
+            "switchover": args.get("switchover", False),
+            "switchover_timeout": args.get("switchover_timeout", 300),
+            "provision_timeout": args.get("provision_timeout", 7200),
+            "status": None,
+            "target_arn": None,
+            "green_endpoint": None,
+        }, opts)
@@ -1,11 +1,15 @@
 import pulumi
-import pulumi_aws as aws
 import json
 from typing import Optional, Dict, Any
 
+from lib.tracing import traced
 
+
+@traced
 class EncryptedBucket(pulumi.ComponentResource):
     def __init__(self, name: str, args: Dict[str, Any], opts: Optional[pulumi.ResourceOptions] = None):
+        from pulumi_aws import get_caller_identity, kms, s3
+
         super().__init__("huckstream:aws:encrypted-bucket", name, {}, opts)
 
         # Set context details
@@ -22,15 +26,51 @@ class EncryptedBucket(pulumi.ComponentResource):
             "Name": self.base_name
         }
 
+        # Key policy, only overridden from the default when log delivery needs to use the key
+        kms_key_policy = None
+        if args.get("allow_log_delivery"):
+            account_id = get_caller_identity(opts=pulumi.InvokeOptions(parent=self)).account_id
+            kms_key_policy = json.dumps({
+                "Version": "2012-10-17",
+                "Statement": [
+                    {
+                        "Sid": "EnableRootPermissions",
+                        "Effect": "Allow",
+                        "Principal": {"AWS": f"arn:aws:iam::{account_id}:root"},
+                        "Action": "kms:*",
+                        "Resource": "*",
+                    },
+                    {
+                        "Sid": "AllowLogDeliveryUseOfKey",
+                        "Effect": "Allow",
+                        "Principal": {"Service": "delivery.logs.amazonaws.com"},
+                        "Action": [
+                            "kms:Encrypt",
+                            "kms:Decrypt",
+                            "kms:ReEncrypt*",
+                            "kms:GenerateDataKey*",
+                            "kms:DescribeKey"
+                        ],
+                        "Resource": "*",
+                        "Condition": {
+                            "StringEquals": {
+                                "aws:SourceAccount": account_id,
+                            },
+                        },
+                    },
+                ],
+            })
+
         # Create a KMS Key
-        kms_key = aws.kms.Key(self.base_name,
+        kms_key = kms.Key(self.base_name,
             description=f"KMS key for encrypting S3 bucket {self.base_name}",
             deletion_window_in_days=14,
+            policy=kms_key_policy,
             tags=base_tags,
             opts=pulumi.ResourceOptions(parent=self)
         )
 
-        kms_alias = aws.kms.Alias(self.base_name,
+        kms_alias = kms.Alias(self.base_name,
             name=f"alias/{self.base_name}",
             target_key_id=kms_key.key_id,
             opts=pulumi.ResourceOptions(parent=self)
@@ -41,56 +81,109 @@ class EncryptedBucket(pulumi.ComponentResource):
         self.kms_alias_arn = kms_alias.arn
 
         # Create an S3 Bucket encrypted with the KMS Key
-        bucket = aws.s3.Bucket(self.base_name,
+        bucket = s3.Bucket(self.base_name,
             bucket=self.base_name,
-            versioning=aws.s3.BucketVersioningArgs(
+            versioning=s3.BucketVersioningArgs(
                 enabled=True
             ),
-            server_side_encryption_configuration=aws.s3.BucketServerSideEncryptionConfigurationArgs(
-                rule=aws.s3.BucketServerSideEncryptionConfigurationRuleArgs(
-                    apply_server_side_encryption_by_default=aws.s3.BucketServerSideEncryptionConfigurationRuleApplyServerSideEncryptionByDefaultArgs(
+            server_side_encryption_configuration=s3.BucketServerSideEncryptionConfigurationArgs(
+                rule=s3.BucketServerSideEncryptionConfigurationRuleArgs(
+                    apply_server_side_encryption_by_default=s3.BucketServerSideEncryptionConfigurationRuleApplyServerSideEncryptionByDefaultArgs(
                         sse_algorithm="aws:kms",
                         kms_master_key_id=kms_key.arn,
                     ),
+                    # Cache a bucket-level data key instead of calling KMS for every object
+                    bucket_key_enabled=True,
                 ),
             ),
             tags=base_tags,
             opts=pulumi.ResourceOptions(parent=self)
         )
 
+        # Build the bucket policy statements
+        policy_statements = []
+
         # If the VPC endpoint has been passed, set the bucket policy to restrict S3 actions to only
         if args.get("vpce_id"):
-            def create_bucket_policy(bucket_arn_and_vpc_endpoint):
-                bucket_arn, vpc_endpoint_id = bucket_arn_and_vpc_endpoint
-                return json.dumps({
-                    "Version": "2012-10-17",
-                    "Statement": [
-                        {
-                            "Sid": "Restrict-Access-to-Specific-VPCE",
-                            "Effect": "Deny",
-                            "Principal": "*",
-                            "Action": [
-                                "s3:PutObject",
-                                "s3:GetObject",
-                                "s3:DeleteObject",
-                                "s3:DeleteObjectVersion"
-                            ],
-                            "Resource": [
-                                bucket_arn,
-                                f"{bucket_arn}/*"
-                            ],
-                            "Condition": {
-                                "StringNotEquals": {
-                                    "aws:sourceVpce": vpc_endpoint_id,
-                                },
+            def create_vpce_statement(bucket_arn, vpc_endpoint_id):
+                return {
+                    "Sid": "Restrict-Access-to-Specific-VPCE",
+                    "Effect": "Deny",
+                    "Principal": "*",
+                    "Action": [
+                        "s3:PutObject",
+                        "s3:GetObject",
+                        "s3:DeleteObject",
+                        "s3:DeleteObjectVersion"
+                    ],
+                    "Resource": [
+                        bucket_arn,
+                        f"{bucket_arn}/*"
+                    ],
+                    "Condition": {
+                        "StringNotEquals": {
+                            "aws:sourceVpce": vpc_endpoint_id,
+                        },
+                        # AWS service principals (e.g. log delivery) never come through the VPC endpoint
+                        **({
+                            "BoolIfExists": {
+                                "aws:PrincipalIsAWSService": "false",
+                            },
+                        } if args.get("allow_log_delivery") else {}),
+                    },
+                }
+
+            policy_statements.append(
+                pulumi.Output.all(bucket.arn, args["vpce_id"]).apply(lambda a: create_vpce_statement(*a))
+            )
+
+        # If log delivery is allowed, let the AWS log delivery service write objects (e.g. VPC flow logs)
+        if args.get("allow_log_delivery"):
+            def create_log_delivery_statements(bucket_arn):
+                return [
+                    {
+                        "Sid": "AWSLogDeliveryWrite",
+                        "Effect": "Allow",
+                        "Principal": {"Service": "delivery.logs.amazonaws.com"},
+                        "Action": "s3:PutObject",
+                        "Resource": f"{bucket_arn}/AWSLogs/*",
+                        "Condition": {
+                            "StringEquals": {
+                                "s3:x-amz-acl": "bucket-owner-full-control",
+                                "aws:SourceAccount": account_id,
                             },
                         },
-                    ],
+                    },
+                    {
+                        "Sid": "AWSLogDeliveryAclCheck",
+                        "Effect": "Allow",
+                        "Principal": {"Service": "delivery.logs.amazonaws.com"},
+                        "Action": ["s3:GetBucketAcl", "s3:ListBucket"],
+                        "Resource": bucket_arn,
+                        "Condition": {
+                            "StringEquals": {
+                                "aws:SourceAccount": account_id,
+                            },
+                        },
+                    },
+                ]
+
+            policy_statements.append(bucket.arn.apply(create_log_delivery_statements))
+
+        if policy_statements:
+            def create_bucket_policy(statements):
+                flattened = []
+                for statement in statements:
+                    flattened.extend(statement if isinstance(statement, list) else [statement])
+
+                return json.dumps({
+                    "Version": "2012-10-17",
+                    "Statement": flattened,
                 })
 
-            bucket_policy = aws.s3.BucketPolicy(self.base_name,
+            bucket_policy = s3.BucketPolicy(self.base_name,
                 bucket=bucket.bucket,
-                policy=pulumi.Output.all(bucket.arn, args["vpce_id"]).apply(create_bucket_policy),
+                policy=pulumi.Output.all(*policy_statements).apply(create_bucket_policy),
                 opts=pulumi.ResourceOptions(parent=self)
             )
 
@@ -0,0 +1,168 @@
+import argparse
+import ipaddress
+from typing import Optional, Dict, List
+
+
+# AWS reserves the first four and the last address of every subnet
+AWS_RESERVED_ADDRESSES = 5
+
+# Fixed slot per region for allocated regional VPC CIDRs, append only so existing allocations never move
+AWS_REGIONS = [
+    "us-east-1", "us-east-2", "us-west-1", "us-west-2", "ca-central-1", "ca-west-1", "mx-central-1", "sa-east-1",
+    "eu-west-1", "eu-west-2", "eu-west-3", "eu-central-1", "eu-central-2", "eu-north-1", "eu-south-1", "eu-south-2",
+    "il-central-1", "me-south-1", "me-central-1", "af-south-1", "ap-east-1", "ap-east-2", "ap-south-1", "ap-south-2",
+    "ap-northeast-1", "ap-northeast-2", "ap-northeast-3", "ap-southeast-1", "ap-southeast-2", "ap-southeast-3",
+    "ap-southeast-4", "ap-southeast-5", "ap-southeast-7",
+]
+
+
+def plan_subnets(cidr: str, availability_zone_count: int, subnet_sizes: Dict[str, int]) -> Dict[str, List[str]]:
+    """Allocate one subnet per AZ for each tier in subnet_sizes (tier name -> CIDR mask).
+
+    Larger tiers are allocated first so every block stays aligned without gaps. Raises ValueError if the
+    requested subnets don't fit in the VPC CIDR.
+    """
+    network = ipaddress.ip_network(cidr)
+
+    for tier, mask in subnet_sizes.items():
+        if mask < network.prefixlen or mask > 28:
+            raise ValueError(f"Subnet tier '{tier}' mask /{mask} must be between /{network.prefixlen} and /28 for VPC CIDR {cidr}")
+
+    plan = {tier: [] for tier in subnet_sizes}
+    cursor = int(network.network_address)
+    end = int(network.broadcast_address) + 1
+
+    for tier, mask in sorted(subnet_sizes.items(), key=lambda tier_and_mask: tier_and_mask[1]):
+        block_size = 2 ** (network.max_prefixlen - mask)
+        for _ in range(availability_zone_count):
+            # Align to the block boundary
+            cursor = -(-cursor // block_size) * block_size
+            if cursor + block_size > end:
+                requested = sum(availability_zone_count * 2 ** (network.max_prefixlen - m) for m in subnet_sizes.values())
+                raise ValueError(
+                    f"Requested subnets ({requested} addresses across {availability_zone_count} AZs) "
+                    f"do not fit in VPC CIDR {cidr} ({network.num_addresses} addresses)"
+                )
+            plan[tier].append(str(ipaddress.ip_network((cursor, mask))))
+            cursor += block_size
+
+    return plan
+
+
+def check_no_overlap(cidrs: List[str], reserved: Optional[List[str]] = None):
+    """Raise ValueError if any two cidrs overlap, or if any of them overlaps a reserved CIDR."""
+    for i, cidr in enumerate(cidrs):
+        network = ipaddress.ip_network(cidr)
+        overlapping = [
+            other for other in cidrs[i + 1:] + (reserved or [])
+            if network.overlaps(ipaddress.ip_network(other))
+        ]
+        if overlapping:
+            raise ValueError(f"CIDR {cidr} overlaps {', '.join(overlapping)}")
+
+
+def allocate_vpc_cidrs(pool: str, prefix: int, count: int, reserved: List[str]) -> List[str]:
+    """Pick count non-overlapping /prefix blocks from pool, skipping any that overlap a reserved CIDR."""
+    reserved_networks = [ipaddress.ip_network(cidr) for cidr in reserved]
+
+    allocated = []
+    for candidate in ipaddress.ip_network(pool).subnets(new_prefix=prefix):
+        if len(allocated) == count:
+            break
+        if any(candidate.overlaps(network) for network in reserved_networks):
+            continue
+        allocated.append(str(candidate))
+
+    if len(allocated) < count:
+        raise ValueError(f"CIDR pool {pool} has only {len(allocated)} free /{prefix} blocks, {count} required")
+
+    return allocated
+
+
+def assign_vpc_cidrs(names: List[str], explicit: Dict[str, str], existing: Dict[str, str],
+                     pool: str, prefix: int, reserved: List[str]) -> Dict[str, str]:
+    """Give every name a VPC CIDR: its explicit one, else the one it is already deployed with, else a free block.
+
+    existing maps every deployed name (listed or not) to its current CIDR, so allocations never move when
+    names are removed or reordered. Raises ValueError on overlaps or when the pool is exhausted.
+    """
+    assigned = {name: explicit.get(name) or existing.get(name) for name in names}
+    kept = [cidr for cidr in assigned.values() if cidr]
+    # Deployed but no longer listed, their VPCs still exist until destroyed
+    unlisted = [cidr for name, cidr in existing.items() if name not in assigned]
+    check_no_overlap(kept, reserved + unlisted)
+
+    missing = [name for name in names if not assigned[name]]
+    for name, cidr in zip(missing, allocate_vpc_cidrs(pool, prefix, len(missing), reserved + unlisted + kept)):
+        assigned[name] = cidr
+
+    return assigned
+
+
+def assign_region_cidrs(regions: List[str], explicit: Dict[str, str], pool: str, prefix: int,
+                        reserved: List[str]) -> Dict[str, str]:
+    """Give every region its explicit VPC CIDR, else the pool block at its fixed slot in AWS_REGIONS.
+
+    Slot 0 of the pool is never used, it is left to shared VPCs such as OpenVPN. Allocations only depend on the
+    region name, so adding, removing or reordering regions never moves another region's VPC. Raises ValueError
+    for unknown regions and on overlaps, both fixed by setting the region's vpcCidr.
+    """
+    blocks = list(ipaddress.ip_network(pool).subnets(new_prefix=prefix))
+
+    assigned = {}
+    for region in regions:
+        if explicit.get(region):
+            assigned[region] = explicit[region]
+            continue
+
+        if region not in AWS_REGIONS:
+            raise ValueError(f"No CIDR slot for region {region}, set its vpcCidr")
+        slot = AWS_REGIONS.index(region) + 1
+        if slot >= len(blocks):
+            raise ValueError(f"CIDR pool {pool} has no /{prefix} block for region {region}, set its vpcCidr")
+        assigned[region] = str(blocks[slot])
+
+    check_no_overlap(list(assigned.values()), reserved)
+    return assigned
+
+
+def format_plan(cidr: str, plan: Dict[str, List[str]]) -> str:
+    """Render the allocated CIDRs and usable address capacity per tier."""
+    network = ipaddress.ip_network(cidr)
+
+    lines = [f"VPC {cidr} ({network.num_addresses} addresses)"]
+    allocated = 0
+    for tier, cidr_blocks in plan.items():
+        tier_addresses = sum(ipaddress.ip_network(block).num_addresses for block in cidr_blocks)
+        usable_per_subnet = ipaddress.ip_network(cidr_blocks[0]).num_addresses - AWS_RESERVED_ADDRESSES if cidr_blocks else 0
+        allocated += tier_addresses
+        lines.append(f"  {tier}: {', '.join(cidr_blocks)}")
+        lines.append(f"    usable: {usable_per_subnet} per AZ, {usable_per_subnet * len(cidr_blocks)} total")
+
+    lines.append(f"  unallocated: {network.num_addresses - allocated} addresses")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan VPC subnet CIDRs and report address capacity per tier")
+    parser.add_argument("cidr", help="VPC CIDR, e.g. 10.1.0.0/16")
+    parser.add_argument("--azs", type=int, default=3, help="Number of availability zones")
+    parser.add_argument("--tier", action="append", default=[], metavar="NAME=MASK",
+                        help="Subnet tier and CIDR mask, e.g. private-app=20 (repeatable)")
+    cli_args = parser.parse_args()
+
+    subnet_sizes = {}
+    for tier in cli_args.tier:
+        tier_name, mask = tier.split("=")
+        subnet_sizes[tier_name] = int(mask)
+
+    try:
+        plan = plan_subnets(cli_args.cidr, cli_args.azs, subnet_sizes)
+    except ValueError as e:
+        parser.exit(1, f"error: {e}\n")
+
+    print(format_plan(cli_args.cidr, plan))
+
+
+if __name__ == "__main__":
+    main()
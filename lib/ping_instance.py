@@ -1,10 +1,14 @@
 import pulumi
-import pulumi_aws as aws
 from typing import Optional, Dict, Any
 
+from lib.tracing import traced
 
+
+@traced
 class PingInstance(pulumi.ComponentResource):
     def __init__(self, name: str, args: Dict[str, Any], opts: Optional[pulumi.ResourceOptions] = None):
+        from pulumi_aws import ec2
+
         super().__init__("huckstream:aws:pingback", name, {}, opts)
 
         # Set context details
@@ -33,12 +37,12 @@ class PingInstance(pulumi.ComponentResource):
 
         # Create the security group
         sg_name = f"{self.base_name}-sg"
-        sg = aws.ec2.SecurityGroup(sg_name,
+        sg = ec2.SecurityGroup(sg_name,
             name=sg_name,
             vpc_id=self.vpc_id,
             description="Allow private ICMP",
             ingress=[
-                aws.ec2.SecurityGroupIngressArgs(
+                ec2.SecurityGroupIngressArgs(
                     protocol="icmp",
                     from_port=-1,               # -1 specifies all ICMP types
                     to_port=-1,                 # -1 specifies all ICMP codes
@@ -46,7 +50,7 @@ class PingInstance(pulumi.ComponentResource):
                 ),
             ],
             egress=[
-                aws.ec2.SecurityGroupEgressArgs(
+                ec2.SecurityGroupEgressArgs(
                     protocol="-1",
                     from_port=0,
                     to_port=0,
@@ -63,7 +67,7 @@ class PingInstance(pulumi.ComponentResource):
         self.security_group_id = sg.id
 
         # Create the EC2 instance
-        ec2 = aws.ec2.Instance(self.base_name,
+        instance = ec2.Instance(self.base_name,
             # Networking config
             subnet_id=self.subnet_id,
             vpc_security_group_ids=[self.security_group_id],
@@ -72,7 +76,7 @@ class PingInstance(pulumi.ComponentResource):
             # Instance config
             ami=self.ami_id,
             instance_type=self.instance_type,
-            metadata_options=aws.ec2.InstanceMetadataOptionsArgs(
+            metadata_options=ec2.InstanceMetadataOptionsArgs(
                 http_tokens="required",  # Require the use of IMDSv2
                 http_endpoint="enabled",
                 http_put_response_hop_limit=2,
@@ -82,7 +86,7 @@ class PingInstance(pulumi.ComponentResource):
             iam_instance_profile=self.instance_profile,
 
             # Set root storage
-            root_block_device=aws.ec2.InstanceRootBlockDeviceArgs(
+            root_block_device=ec2.InstanceRootBlockDeviceArgs(
                 delete_on_termination=True,
                 volume_type="gp3",
                 volume_size=8,  # Size in GB
@@ -96,8 +100,8 @@ class PingInstance(pulumi.ComponentResource):
             opts=pulumi.ResourceOptions(parent=self)
         )
 
-        self.public_ip = ec2.public_ip
-        self.private_ip = ec2.private_ip
+        self.public_ip = instance.public_ip
+        self.private_ip = instance.private_ip
 
         # Register outputs
         self.register_outputs({
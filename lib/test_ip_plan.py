@@ -0,0 +1,76 @@
+import pytest
+
+from lib.ip_plan import assign_region_cidrs, assign_vpc_cidrs, plan_subnets
+
+
+POOL = "10.0.0.0/8"
+OPEN_VPN = ["10.0.0.0/16"]
+
+
+def test_plan_subnets_largest_tier_first():
+    assert plan_subnets("10.1.0.0/16", 2, {"public": 24, "private-app": 20}) == {
+        "public": ["10.1.32.0/24", "10.1.33.0/24"],
+        "private-app": ["10.1.0.0/20", "10.1.16.0/20"],
+    }
+
+
+def test_assign_vpc_cidrs_skips_reserved():
+    assert assign_vpc_cidrs(["a", "b", "c"], {}, {}, POOL, 16, OPEN_VPN) == {
+        "a": "10.1.0.0/16",
+        "b": "10.2.0.0/16",
+        "c": "10.3.0.0/16",
+    }
+
+
+def test_assign_vpc_cidrs_keeps_existing_when_removed_or_reordered():
+    existing = assign_vpc_cidrs(["a", "b", "c"], {}, {}, POOL, 16, OPEN_VPN)
+
+    # b is dropped from the list but still deployed, c must not move into its block
+    assert assign_vpc_cidrs(["c", "a", "d"], {}, existing, POOL, 16, OPEN_VPN) == {
+        "c": "10.3.0.0/16",
+        "a": "10.1.0.0/16",
+        "d": "10.4.0.0/16",
+    }
+
+    # Once b is destroyed its block can be reused
+    del existing["b"]
+    assert assign_vpc_cidrs(["c", "d"], {}, existing, POOL, 16, OPEN_VPN) == {
+        "c": "10.3.0.0/16",
+        "d": "10.2.0.0/16",
+    }
+
+
+def test_assign_vpc_cidrs_explicit_wins_over_existing():
+    assigned = assign_vpc_cidrs(["a"], {"a": "10.20.0.0/16"}, {"a": "10.1.0.0/16"}, POOL, 16, OPEN_VPN)
+    assert assigned == {"a": "10.20.0.0/16"}
+
+
+def test_assign_vpc_cidrs_rejects_overlaps():
+    with pytest.raises(ValueError, match="overlaps"):
+        assign_vpc_cidrs(["a", "b"], {"a": "10.1.0.0/16", "b": "10.1.128.0/17"}, {}, POOL, 16, OPEN_VPN)
+    with pytest.raises(ValueError, match="overlaps"):
+        assign_vpc_cidrs(["a"], {"a": "10.0.0.0/16"}, {}, POOL, 16, OPEN_VPN)
+    # A deployed stack dropped from the list still owns its block
+    with pytest.raises(ValueError, match="overlaps"):
+        assign_vpc_cidrs(["a"], {"a": "10.2.0.0/16"}, {"b": "10.2.0.0/16"}, POOL, 16, OPEN_VPN)
+
+
+def test_assign_region_cidrs_keyed_by_region():
+    assigned = assign_region_cidrs(["eu-west-1", "us-east-1"], {}, POOL, 16, OPEN_VPN)
+    assert assigned == {"eu-west-1": "10.9.0.0/16", "us-east-1": "10.1.0.0/16"}
+
+    # Dropping or reordering regions leaves the others where they are
+    assert assign_region_cidrs(["us-west-2", "eu-west-1"], {}, POOL, 16, OPEN_VPN) == {
+        "us-west-2": "10.4.0.0/16",
+        "eu-west-1": "10.9.0.0/16",
+    }
+
+
+def test_assign_region_cidrs_rejects_unknown_and_overlapping():
+    with pytest.raises(ValueError, match="set its vpcCidr"):
+        assign_region_cidrs(["xx-nowhere-1"], {}, POOL, 16, OPEN_VPN)
+    assert assign_region_cidrs(["xx-nowhere-1"], {"xx-nowhere-1": "10.200.0.0/16"}, POOL, 16, OPEN_VPN) == {
+        "xx-nowhere-1": "10.200.0.0/16",
+    }
+    with pytest.raises(ValueError, match="overlaps"):
+        assign_region_cidrs(["us-east-1"], {}, POOL, 16, ["10.1.0.0/16"])
@@ -0,0 +1,180 @@
+import atexit
+import functools
+import json
+import time
+from collections import defaultdict
+from typing import Optional, Dict, Any, List
+
+import pulumi
+
+
+class _Tracer:
+    def __init__(self, path: str):
+        self.path = path
+        self.started = time.perf_counter()
+        self.events: List[Dict[str, Any]] = []
+
+        # Components under construction (or whose apply callback is running), innermost last
+        self.stack: List[str] = []
+        # component name -> [(component, trace name)], used to attribute child resources by parent URN
+        self.components: Dict[str, List[Any]] = defaultdict(list)
+        # URN -> parent URN of every resource registered so far, to walk up from nested children
+        self.parents: Dict[str, str] = {}
+
+        self.children = defaultdict(int)
+        self.descendants = defaultdict(int)
+        self.pending_applies = defaultdict(int)
+        self.pending_at_construction: Dict[str, int] = {}
+        self.apply_count = defaultdict(int)
+        self.apply_seconds = defaultdict(float)
+
+    def now_us(self) -> float:
+        return (time.perf_counter() - self.started) * 1e6
+
+    def record(self, name: str, category: str, start_us: float, end_us: float, tid: int):
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_us,
+            "dur": end_us - start_us,
+            "pid": 0,
+            "tid": tid,
+        })
+
+    def write(self):
+        for event in self.events:
+            if event["cat"] == "component":
+                name = event["name"]
+                event["args"] = {
+                    "child_resources": self.children[name],
+                    "descendant_resources": self.descendants[name],
+                    "outputs_pending_after_construction": self.pending_at_construction.get(name, 0),
+                    "outputs_never_resolved": self.pending_applies[name],
+                    "apply_callbacks": self.apply_count[name],
+                    "apply_seconds": round(self.apply_seconds[name], 6),
+                }
+
+        with open(self.path, "w") as f:
+            json.dump({
+                "traceEvents": [
+                    {"name": "thread_name", "ph": "M", "pid": 0, "tid": 0, "args": {"name": "construction"}},
+                    {"name": "thread_name", "ph": "M", "pid": 0, "tid": 1, "args": {"name": "apply callbacks"}},
+                    *self.events,
+                ],
+                "displayTimeUnit": "ms",
+            }, f, indent=1)
+
+
+_tracer: Optional[_Tracer] = None
+
+
+def parse_urn(urn: str):
+    """Split urn:pulumi:<stack>::<project>::<parent$...$type>::<name> into (type, name)."""
+    _, _, qualified_type, name = urn.split("::", 3)
+    return qualified_type.split("$")[-1], name
+
+
+def child_urn(parent_urn: str, type_: str, name: str) -> str:
+    """URN of a resource named name of type type_ registered under parent_urn."""
+    stack, project, qualified_type, _ = parent_urn.split("::", 3)
+    # Children of the stack don't carry its type
+    if qualified_type != "pulumi:pulumi:Stack":
+        type_ = f"{qualified_type}${type_}"
+    return f"{stack}::{project}::{type_}::{name}"
+
+
+def enable(path: str):
+    """Start recording component construction and apply callback timings, written to path on exit."""
+    global _tracer
+    if _tracer is not None:
+        return
+
+    _tracer = _Tracer(path)
+    tracer = _tracer
+
+    # Time every apply callback registered while a traced component is constructing
+    original_apply = pulumi.Output.apply
+
+    def apply(self, func, run_with_unknowns=False):
+        if not tracer.stack:
+            return original_apply(self, func, run_with_unknowns)
+
+        owner = tracer.stack[-1]
+        tracer.pending_applies[owner] += 1
+
+        def timed(value):
+            tracer.stack.append(owner)
+            start = tracer.now_us()
+            try:
+                return func(value)
+            finally:
+                end = tracer.now_us()
+                tracer.stack.pop()
+                tracer.pending_applies[owner] -= 1
+                tracer.apply_count[owner] += 1
+                tracer.apply_seconds[owner] += (end - start) / 1e6
+                tracer.record(f"{owner} apply {getattr(func, '__name__', 'callback')}", "apply", start, end, 1)
+
+        return original_apply(self, timed, run_with_unknowns)
+
+    pulumi.Output.apply = apply
+
+    # Count resources registered under a traced component, directly and through nested components (e.g.
+    # the subnets, route tables and NAT gateways awsx parents to its own Vpc). Transforms are called back
+    # from the engine with a URN-only stand-in for the parent, so match ancestors on their type and name
+    def traced_component(urn: str) -> Optional[str]:
+        urn_type, urn_name = parse_urn(urn)
+        for component, trace_name in tracer.components.get(urn_name, []):
+            if getattr(component, "pulumi_resource_type", None) == urn_type:
+                return trace_name
+        return None
+
+    async def count_children(args: pulumi.ResourceTransformArgs):
+        parent = args.opts.parent if args.opts else None
+        if parent is None:
+            return None
+
+        parent_urn = await parent.urn.future()
+        tracer.parents[child_urn(parent_urn, args.type_, args.name)] = parent_urn
+
+        direct = True
+        ancestor = parent_urn
+        while ancestor is not None:
+            trace_name = traced_component(ancestor)
+            if trace_name is not None:
+                if direct:
+                    tracer.children[trace_name] += 1
+                tracer.descendants[trace_name] += 1
+            direct = False
+            ancestor = tracer.parents.get(ancestor)
+        return None
+
+    pulumi.runtime.register_resource_transform(count_children)
+
+    atexit.register(tracer.write)
+
+
+def traced(cls):
+    """Class decorator recording construction time of a ComponentResource when tracing is enabled."""
+    original_init = cls.__init__
+
+    @functools.wraps(original_init)
+    def __init__(self, name: str, *args, **kwargs):
+        if _tracer is None:
+            return original_init(self, name, *args, **kwargs)
+
+        trace_name = f"{cls.__name__}:{name}"
+        _tracer.components[name].append((self, trace_name))
+        _tracer.stack.append(trace_name)
+        start = _tracer.now_us()
+        try:
+            original_init(self, name, *args, **kwargs)
+        finally:
+            end = _tracer.now_us()
+            _tracer.stack.pop()
+            _tracer.pending_at_construction[trace_name] = _tracer.pending_applies[trace_name]
+            _tracer.record(trace_name, "component", start, end, 0)
+
+    cls.__init__ = __init__
+    return cls
@@ -1,7 +1,41 @@
 import pulumi
-import pulumi_aws as aws
-import pulumi_awsx as awsx
-from typing import Optional, List, Dict, Any
+import json
+from typing import Optional, List, Dict, Any, TYPE_CHECKING
+
+from lib.ip_plan import plan_subnets, format_plan
+from lib.tracing import traced
+
+if TYPE_CHECKING:
+    from pulumi_aws import ec2
+
+
+# VPC flow log fields and their Parquet/Glue column types, in log format order
+FLOW_LOG_FIELDS = [
+    ("version", "int"),
+    ("account-id", "string"),
+    ("interface-id", "string"),
+    ("srcaddr", "string"),
+    ("dstaddr", "string"),
+    ("srcport", "int"),
+    ("dstport", "int"),
+    ("protocol", "bigint"),
+    ("packets", "bigint"),
+    ("bytes", "bigint"),
+    ("start", "bigint"),
+    ("end", "bigint"),
+    ("action", "string"),
+    ("log-status", "string"),
+    ("vpc-id", "string"),
+    ("subnet-id", "string"),
+    ("az-id", "string"),
+    ("pkt-srcaddr", "string"),
+    ("pkt-dstaddr", "string"),
+    ("flow-direction", "string"),
+    ("traffic-path", "int"),
+]
+
+# Hive-compatible partitions written by flow log delivery with per-hour partitioning
+FLOW_LOG_PARTITIONS = ["aws-account-id", "aws-service", "aws-region", "year", "month", "day", "hour"]
 
 
 class VpcArgs:
@@ -11,31 +45,70 @@ class VpcArgs:
                  name: str,
                  region: str,
                  cidr: str,
+                 availability_zone_count: Optional[int] = None,
+                 subnet_sizes: Optional[Dict[str, int]] = None,
+                 report_ip_plan: Optional[bool] = None,
                  open_vpn_vpc_id: Optional[pulumi.Input[str]] = None,
                  open_vpn_vpc_cidr: Optional[pulumi.Input[str]] = None,
-                 open_vpn_vpc_rtbls: Optional[pulumi.Output[List[aws.ec2.RouteTable]]] = None,
+                 open_vpn_vpc_rtbls: Optional[pulumi.Output[List["ec2.RouteTable"]]] = None,
+                 transit_gateway_id: Optional[pulumi.Input[str]] = None,
+                 transit_gateway_cidrs: Optional[List[str]] = None,
+                 transit_gateway_route_table_id: Optional[pulumi.Input[str]] = None,
+                 transit_gateway_propagation_route_table_ids: Optional[List[pulumi.Input[str]]] = None,
                  public_subnets: Optional[bool] = None,
                  private_app_subnets: Optional[bool] = None,
                  private_data_subnets: Optional[bool] = None,
                  isolated_data_subnets: Optional[bool] = None,
-                 interface_endpoints: Optional[List[str]] = None):
+                 nat_gateway_strategy: Optional[str] = None,
+                 interface_endpoints: Optional[List[str]] = None,
+                 interface_endpoint_subnets: Optional[str] = None,
+                 shared_interface_endpoints: Optional[Dict[str, pulumi.Input[str]]] = None,
+                 shared_resolver_rule_ids: Optional[List[pulumi.Input[str]]] = None,
+                 flow_logs_bucket_arn: Optional[pulumi.Input[str]] = None,
+                 flow_logs_traffic_type: Optional[str] = None,
+                 monitoring: Optional[bool] = None,
+                 alarm_actions: Optional[List[pulumi.Input[str]]] = None,
+                 nat_packets_drop_threshold: Optional[int] = None,
+                 endpoint_packets_drop_threshold: Optional[int] = None):
         self.namespace = namespace
         self.environment = environment
         self.name = name
         self.region = region
         self.cidr = cidr
+        self.availability_zone_count = availability_zone_count
+        self.subnet_sizes = subnet_sizes or {}
+        self.report_ip_plan = report_ip_plan
         self.open_vpn_vpc_id = open_vpn_vpc_id
         self.open_vpn_vpc_cidr = open_vpn_vpc_cidr
         self.open_vpn_vpc_rtbls = open_vpn_vpc_rtbls
+        self.transit_gateway_id = transit_gateway_id
+        self.transit_gateway_cidrs = transit_gateway_cidrs or []
+        self.transit_gateway_route_table_id = transit_gateway_route_table_id
+        self.transit_gateway_propagation_route_table_ids = transit_gateway_propagation_route_table_ids or []
         self.public_subnets = public_subnets
         self.private_app_subnets = private_app_subnets
         self.private_data_subnets = private_data_subnets
         self.isolated_data_subnets = isolated_data_subnets
+        self.nat_gateway_strategy = nat_gateway_strategy
         self.interface_endpoints = interface_endpoints or []
-
-
+        self.interface_endpoint_subnets = interface_endpoint_subnets
+        self.shared_interface_endpoints = shared_interface_endpoints or {}
+        self.shared_resolver_rule_ids = shared_resolver_rule_ids or []
+        self.flow_logs_bucket_arn = flow_logs_bucket_arn
+        self.flow_logs_traffic_type = flow_logs_traffic_type
+        self.monitoring = monitoring
+        self.alarm_actions = alarm_actions or []
+        self.nat_packets_drop_threshold = nat_packets_drop_threshold
+        self.endpoint_packets_drop_threshold = endpoint_packets_drop_threshold
+
+
+@traced
 class Vpc(pulumi.ComponentResource):
     def __init__(self, name: str, args: Dict[str, Any], opts: Optional[pulumi.ResourceOptions] = None):
+        # Import provider submodules on construction only, pulumi_aws is expensive to load
+        from pulumi_aws import cloudwatch, ec2, ec2transitgateway, get_caller_identity, glue, route53
+        from pulumi_awsx import ec2 as awsx_ec2
+
         super().__init__("huckstream:aws:vpc", name, {}, opts)
 
         # Set context details
@@ -45,6 +118,11 @@ class Vpc(pulumi.ComponentResource):
 
         self.base_name = f"{self.namespace}-{self.environment}-{self.name}"
 
+        # Some children used to have fixed names. Child URNs don't include the parent's name, so only the
+        # original single-region "vpc" component may claim them, other instances would alias the same URNs
+        def legacy_aliases(legacy_name: str) -> List[pulumi.Alias]:
+            return [pulumi.Alias(name=legacy_name)] if name == "vpc" else []
+
         # Set tags
         base_tags = {
             "Namespace": self.namespace,
@@ -52,20 +130,47 @@ class Vpc(pulumi.ComponentResource):
             "Name": self.base_name
         }
 
+        # Plan explicit subnet CIDRs per tier, failing at preview time if they don't fit
+        availability_zone_count = args.get("availability_zone_count", 3)
+        subnet_plan = {}
+
+        if args.get("subnet_sizes"):
+            enabled_tiers = [
+                tier for tier, enabled in [
+                    ("public", args.get("public_subnets")),
+                    ("private-app", args.get("private_app_subnets")),
+                    ("private-data", args.get("private_data_subnets")),
+                    ("isolated-data", args.get("isolated_data_subnets")),
+                ] if enabled
+            ]
+
+            missing_tiers = [tier for tier in enabled_tiers if tier not in args["subnet_sizes"]]
+            if missing_tiers:
+                raise ValueError(f"Missing subnet_sizes for enabled subnet tiers: {', '.join(missing_tiers)}")
+
+            subnet_plan = plan_subnets(args["cidr"], availability_zone_count, {
+                tier: args["subnet_sizes"][tier] for tier in enabled_tiers
+            })
+
+            if args.get("report_ip_plan"):
+                pulumi.log.info(format_plan(args["cidr"], subnet_plan), resource=self)
+
         # Create the subnet specs
         subnet_specs = []
 
         if args.get("public_subnets"):
-            public_subnets = awsx.ec2.SubnetSpecArgs(
-                type=awsx.ec2.SubnetType.PUBLIC,
-                name="public"
+            public_subnets = awsx_ec2.SubnetSpecArgs(
+                type=awsx_ec2.SubnetType.PUBLIC,
+                name="public",
+                cidr_blocks=subnet_plan.get("public")
             )
             subnet_specs.append(public_subnets)
 
         if args.get("private_app_subnets"):
-            private_app_subnets = awsx.ec2.SubnetSpecArgs(
-                type=awsx.ec2.SubnetType.PRIVATE,
+            private_app_subnets = awsx_ec2.SubnetSpecArgs(
+                type=awsx_ec2.SubnetType.PRIVATE,
                 name="private-app",
+                cidr_blocks=subnet_plan.get("private-app"),
                 tags={
                     **base_tags,
                     "PrivateSubnetType": "App"
@@ -74,9 +179,10 @@ class Vpc(pulumi.ComponentResource):
             subnet_specs.append(private_app_subnets)
 
         if args.get("private_data_subnets"):
-            private_data_subnets = awsx.ec2.SubnetSpecArgs(
-                type=awsx.ec2.SubnetType.PRIVATE,
+            private_data_subnets = awsx_ec2.SubnetSpecArgs(
+                type=awsx_ec2.SubnetType.PRIVATE,
                 name="private-data",
+                cidr_blocks=subnet_plan.get("private-data"),
                 tags={
                     **base_tags,
                     "PrivateSubnetType": "Data"
@@ -85,27 +191,35 @@ class Vpc(pulumi.ComponentResource):
             subnet_specs.append(private_data_subnets)
 
         if args.get("isolated_data_subnets"):
-            isolated_data_subnets = awsx.ec2.SubnetSpecArgs(
-                type=awsx.ec2.SubnetType.ISOLATED,
-                name="isolated-data"
+            isolated_data_subnets = awsx_ec2.SubnetSpecArgs(
+                type=awsx_ec2.SubnetType.ISOLATED,
+                name="isolated-data",
+                cidr_blocks=subnet_plan.get("isolated-data")
             )
             subnet_specs.append(isolated_data_subnets)
 
-        # Set NAT Gateway strategy
-        nat_gw_strategy = (awsx.ec2.NatGatewayStrategy.SINGLE
+        # Set NAT Gateway strategy, a single NAT gateway by default or one per AZ to keep egress in-AZ
+        nat_gateway_strategies = ["NONE", "SINGLE", "ONE_PER_AZ"]
+        nat_gateway_strategy = args.get("nat_gateway_strategy", "SINGLE")
+        if nat_gateway_strategy not in nat_gateway_strategies:
+            raise ValueError(
+                f"nat_gateway_strategy must be one of {', '.join(nat_gateway_strategies)}, got '{nat_gateway_strategy}'"
+            )
+
+        nat_gw_strategy = (awsx_ec2.NatGatewayStrategy[nat_gateway_strategy]
                           if args.get("public_subnets") and (args.get("private_app_subnets") or args.get("private_data_subnets"))
-                          else awsx.ec2.NatGatewayStrategy.NONE)
+                          else awsx_ec2.NatGatewayStrategy.NONE)
 
         # Create the VPC
-        vpc = awsx.ec2.Vpc(self.base_name,
+        vpc = awsx_ec2.Vpc(self.base_name,
             # IP Config
             cidr_block=args["cidr"],
-            number_of_availability_zones=3,
+            number_of_availability_zones=availability_zone_count,
             subnet_specs=subnet_specs,
-            subnet_strategy=awsx.ec2.SubnetAllocationStrategy.AUTO,
+            subnet_strategy=awsx_ec2.SubnetAllocationStrategy.AUTO,
 
             # NAT Gateway config
-            nat_gateways=awsx.ec2.NatGatewayConfigurationArgs(
+            nat_gateways=awsx_ec2.NatGatewayConfigurationArgs(
                 strategy=nat_gw_strategy
             ),
 
@@ -123,6 +237,50 @@ class Vpc(pulumi.ComponentResource):
         self.private_subnet_ids = vpc.private_subnet_ids
         self.isolated_subnet_ids = vpc.isolated_subnet_ids
         self.route_tables = vpc.route_tables
+        self.subnet_plan = subnet_plan
+
+        # Subnet IDs per tier, one subnet per AZ. The private tiers share a subnet type in awsx, so
+        # tell them apart by their PrivateSubnetType tag
+        def private_subnet_ids_of_type(private_subnet_type):
+            return vpc.subnets.apply(
+                lambda subnets: pulumi.Output.all(*[
+                    pulumi.Output.all(subnet.id, subnet.tags) for subnet in subnets
+                ]).apply(
+                    lambda ids_and_tags: [
+                        subnet_id for subnet_id, tags in ids_and_tags
+                        if (tags or {}).get("PrivateSubnetType") == private_subnet_type
+                    ]
+                )
+            )
+
+        self.subnet_ids_by_tier = {
+            tier: subnet_ids for tier, enabled, subnet_ids in [
+                ("public", args.get("public_subnets"), vpc.public_subnet_ids),
+                ("private-app", args.get("private_app_subnets"), private_subnet_ids_of_type("App")),
+                ("private-data", args.get("private_data_subnets"), private_subnet_ids_of_type("Data")),
+                ("isolated-data", args.get("isolated_data_subnets"), vpc.isolated_subnet_ids),
+            ] if enabled
+        }
+
+        # Without subnet_sizes awsx picks the CIDRs (known at preview), report those per tier instead
+        if args.get("report_ip_plan") and not subnet_plan:
+            def subnet_tier(tags):
+                if tags.get("SubnetType") == "Private":
+                    return {"App": "private-app", "Data": "private-data"}.get(tags.get("PrivateSubnetType"))
+                return {"Public": "public", "Isolated": "isolated-data"}.get(tags.get("SubnetType"))
+
+            def report_subnets(cidrs_and_tags):
+                computed_plan = {}
+                for cidr_block, tags in cidrs_and_tags:
+                    computed_plan.setdefault(subnet_tier(tags or {}) or "other", []).append(cidr_block)
+                pulumi.log.info(format_plan(args["cidr"], computed_plan), resource=self)
+
+            vpc.subnets.apply(
+                lambda subnets: pulumi.Output.all(*[
+                    pulumi.Output.all(subnet.cidr_block, subnet.tags) for subnet in subnets
+                ]).apply(report_subnets)
+            )
+
         self.private_route_tables = vpc.route_tables.apply(
             lambda rtbls: pulumi.Output.all([
                 rtbl.tags.apply(lambda tags: {"rtbl": rtbl, "tags": tags})
@@ -137,7 +295,7 @@ class Vpc(pulumi.ComponentResource):
 
         # Gateway Endpoints
         # DynamoDB
-        dynamodb_endpoint = aws.ec2.VpcEndpoint("dynamodb",
+        dynamodb_endpoint = ec2.VpcEndpoint(f"{self.base_name}-dynamodb",
             vpc_id=vpc.vpc_id,
             service_name=f"com.amazonaws.{args['region']}.dynamodb",
             vpc_endpoint_type="Gateway",
@@ -146,13 +304,13 @@ class Vpc(pulumi.ComponentResource):
                 **base_tags,
                 "Name": f"{self.base_name}-dynamodb"
             },
-            opts=pulumi.ResourceOptions(parent=self)
+            opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases("dynamodb"))
         )
 
         self.dynamodb_endpoint_id = dynamodb_endpoint.id
 
         # S3
-        s3_endpoint = aws.ec2.VpcEndpoint("s3",
+        s3_endpoint = ec2.VpcEndpoint(f"{self.base_name}-s3",
             vpc_id=vpc.vpc_id,
             service_name=f"com.amazonaws.{args['region']}.s3",
             vpc_endpoint_type="Gateway",
@@ -161,20 +319,21 @@ class Vpc(pulumi.ComponentResource):
                 **base_tags,
                 "Name": f"{self.base_name}-s3"
             },
-            opts=pulumi.ResourceOptions(parent=self)
+            opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases("s3"))
         )
 
         self.s3_endpoint_id = s3_endpoint.id
+        self.s3_prefix_list_id = s3_endpoint.prefix_list_id
 
         # Interface Endpoints
         # Security group
         vpce_sg_name = f"{self.base_name}-vpce-sg"
-        vpce_sg = aws.ec2.SecurityGroup("vpce-security-group",
+        vpce_sg = ec2.SecurityGroup(f"{self.base_name}-vpce-security-group",
             name=vpce_sg_name,
             vpc_id=self.vpc_id,
             description="Allow local traffic",
             ingress=[
-                aws.ec2.SecurityGroupIngressArgs(
+                ec2.SecurityGroupIngressArgs(
                     protocol="-1",
                     from_port=0,
                     to_port=0,
@@ -182,7 +341,7 @@ class Vpc(pulumi.ComponentResource):
                 ),
             ],
             egress=[
-                aws.ec2.SecurityGroupEgressArgs(
+                ec2.SecurityGroupEgressArgs(
                     protocol="-1",
                     from_port=0,
                     to_port=0,
@@ -193,36 +352,310 @@ class Vpc(pulumi.ComponentResource):
                 **base_tags,
                 "Name": vpce_sg_name
             },
-            opts=pulumi.ResourceOptions(parent=self)
+            opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases("vpce-security-group"))
         )
 
+        # Choose which subnet tier the endpoint ENIs land in (one ENI per AZ)
+        endpoint_subnet_tier = args.get("interface_endpoint_subnets", "isolated-data")
+        if args.get("interface_endpoints") and endpoint_subnet_tier not in self.subnet_ids_by_tier:
+            raise ValueError(
+                f"interface_endpoint_subnets must be one of the enabled subnet tiers "
+                f"({', '.join(self.subnet_ids_by_tier) or 'none'}), got '{endpoint_subnet_tier}'"
+            )
+        endpoint_subnet_ids = self.subnet_ids_by_tier.get(endpoint_subnet_tier)
+
+        # Reuse centrally hosted endpoints by associating their private hosted zones with this VPC
+        shared_interface_endpoints = args.get("shared_interface_endpoints", {})
+        for service, hosted_zone_id in shared_interface_endpoints.items():
+            route53.ZoneAssociation(f"{self.base_name}-{service}-shared-endpoint",
+                zone_id=hosted_zone_id,
+                vpc_id=vpc.vpc_id,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+        # Share resolver rules from the bootstrap stack (e.g. forwarding endpoint DNS to the hub VPC)
+        for i, resolver_rule_id in enumerate(args.get("shared_resolver_rule_ids", [])):
+            route53.ResolverRuleAssociation(f"{self.base_name}-resolver-rule-{i}",
+                resolver_rule_id=resolver_rule_id,
+                vpc_id=vpc.vpc_id,
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
         interface_endpoints = []
         for service in args.get("interface_endpoints", []):
-            vpce = aws.ec2.VpcEndpoint(service,
+            # Skip services already served by a shared endpoint
+            if service in shared_interface_endpoints:
+                continue
+
+            vpce = ec2.VpcEndpoint(f"{self.base_name}-{service}",
                 vpc_id=vpc.vpc_id,
                 service_name=f"com.amazonaws.{args['region']}.{service}",
                 vpc_endpoint_type="Interface",
                 security_group_ids=[vpce_sg.id],
-                subnet_ids=vpc.isolated_subnet_ids,
+                subnet_ids=endpoint_subnet_ids,
                 private_dns_enabled=True,
                 tags={
                     **base_tags,
                     "Name": f"{self.base_name}-{service}"
                 },
+                opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases(service))
+            )
+            interface_endpoints.append((service, vpce))
+
+        # Monitoring
+        self.dashboard_name = None
+
+        if args.get("monitoring"):
+            alarm_actions = args.get("alarm_actions", [])
+            nat_packets_drop_threshold = args.get("nat_packets_drop_threshold", 100)
+            endpoint_packets_drop_threshold = args.get("endpoint_packets_drop_threshold", 100)
+
+            # NAT gateway alarms, one set per gateway created by the NAT strategy
+            def create_nat_alarms(nat_gateways):
+                for i, nat_gateway in enumerate(nat_gateways):
+                    cloudwatch.MetricAlarm(f"{self.base_name}-nat-{i}-port-allocation",
+                        name=f"{self.base_name}-nat-{i}-port-allocation",
+                        alarm_description=f"Source port exhaustion on NAT gateway {i} of {self.base_name}",
+                        namespace="AWS/NATGateway",
+                        metric_name="ErrorPortAllocation",
+                        dimensions={"NatGatewayId": nat_gateway.id},
+                        statistic="Sum",
+                        period=300,
+                        evaluation_periods=1,
+                        comparison_operator="GreaterThanThreshold",
+                        threshold=0,
+                        treat_missing_data="notBreaching",
+                        alarm_actions=alarm_actions,
+                        tags=base_tags,
+                        opts=pulumi.ResourceOptions(parent=self)
+                    )
+
+                    cloudwatch.MetricAlarm(f"{self.base_name}-nat-{i}-packets-dropped",
+                        name=f"{self.base_name}-nat-{i}-packets-dropped",
+                        alarm_description=f"Packets dropped by NAT gateway {i} of {self.base_name}",
+                        namespace="AWS/NATGateway",
+                        metric_name="PacketsDropCount",
+                        dimensions={"NatGatewayId": nat_gateway.id},
+                        statistic="Sum",
+                        period=300,
+                        evaluation_periods=1,
+                        comparison_operator="GreaterThanThreshold",
+                        threshold=nat_packets_drop_threshold,
+                        treat_missing_data="notBreaching",
+                        alarm_actions=alarm_actions,
+                        tags=base_tags,
+                        opts=pulumi.ResourceOptions(parent=self)
+                    )
+
+            vpc.nat_gateways.apply(create_nat_alarms)
+
+            # Interface endpoint alarms
+            def endpoint_dimensions(vpce):
+                return {
+                    "VPC Id": vpce.vpc_id,
+                    "VPC Endpoint Id": vpce.id,
+                    "Endpoint Type": "Interface",
+                    "Service Name": vpce.service_name,
+                }
+
+            for service, vpce in interface_endpoints:
+                cloudwatch.MetricAlarm(f"{self.base_name}-vpce-{service}-packets-dropped",
+                    name=f"{self.base_name}-vpce-{service}-packets-dropped",
+                    alarm_description=f"Packets dropped by {service} interface endpoint of {self.base_name}",
+                    namespace="AWS/PrivateLinkEndpoints",
+                    metric_name="PacketsDropped",
+                    dimensions=endpoint_dimensions(vpce),
+                    statistic="Sum",
+                    period=300,
+                    evaluation_periods=1,
+                    comparison_operator="GreaterThanThreshold",
+                    threshold=endpoint_packets_drop_threshold,
+                    treat_missing_data="notBreaching",
+                    alarm_actions=alarm_actions,
+                    tags=base_tags,
+                    opts=pulumi.ResourceOptions(parent=vpce)
+                )
+
+            # Dashboard covering all NAT gateways and interface endpoints
+            def create_dashboard_body(nat_gateway_ids_and_endpoints):
+                region = args["region"]
+                nat_gateway_ids = nat_gateway_ids_and_endpoints[0]
+                endpoints = nat_gateway_ids_and_endpoints[1:]
+
+                def metric_widget(title, namespace, metric_names, dimension_sets, stat="Sum"):
+                    metrics = []
+                    for metric_name in metric_names:
+                        for dimensions in dimension_sets:
+                            metric = [namespace, metric_name]
+                            for key, value in dimensions.items():
+                                metric.extend([key, value])
+                            metrics.append(metric)
+
+                    return {
+                        "type": "metric",
+                        "width": 12,
+                        "height": 6,
+                        "properties": {
+                            "title": title,
+                            "region": region,
+                            "stat": stat,
+                            "period": 300,
+                            "view": "timeSeries",
+                            "metrics": metrics,
+                        },
+                    }
+
+                nat_dimensions = [{"NatGatewayId": nat_gateway_id} for nat_gateway_id in nat_gateway_ids]
+                endpoint_dimension_sets = [
+                    {
+                        "VPC Id": vpc_id,
+                        "VPC Endpoint Id": vpce_id,
+                        "Endpoint Type": "Interface",
+                        "Service Name": service_name,
+                    }
+                    for vpc_id, vpce_id, service_name in endpoints
+                ]
+
+                widgets = []
+                if nat_dimensions:
+                    widgets.extend([
+                        metric_widget("NAT port allocation errors", "AWS/NATGateway", ["ErrorPortAllocation"], nat_dimensions),
+                        metric_widget("NAT packets dropped", "AWS/NATGateway", ["PacketsDropCount"], nat_dimensions),
+                        metric_widget("NAT bytes out to destination", "AWS/NATGateway", ["BytesOutToDestination"], nat_dimensions),
+                        metric_widget("NAT active connections", "AWS/NATGateway", ["ActiveConnectionCount"], nat_dimensions, stat="Maximum"),
+                    ])
+                if endpoint_dimension_sets:
+                    widgets.extend([
+                        metric_widget("Endpoint bytes processed", "AWS/PrivateLinkEndpoints", ["BytesProcessed"], endpoint_dimension_sets),
+                        metric_widget("Endpoint packets dropped", "AWS/PrivateLinkEndpoints", ["PacketsDropped"], endpoint_dimension_sets),
+                    ])
+
+                return json.dumps({"widgets": widgets})
+
+            dashboard = cloudwatch.Dashboard(f"{self.base_name}-network",
+                dashboard_name=f"{self.base_name}-network",
+                dashboard_body=pulumi.Output.all(
+                    vpc.nat_gateways.apply(lambda nat_gateways: pulumi.Output.all(*[nat_gateway.id for nat_gateway in nat_gateways])),
+                    *[pulumi.Output.all(vpce.vpc_id, vpce.id, vpce.service_name) for _, vpce in interface_endpoints]
+                ).apply(create_dashboard_body),
                 opts=pulumi.ResourceOptions(parent=self)
             )
-            interface_endpoints.append(vpce)
+
+            self.dashboard_name = dashboard.dashboard_name
+
+        # Flow Logs
+        self.flow_log_id = None
+        self.flow_logs_table_name = None
+
+        if args.get("flow_logs_bucket_arn") is not None:
+            # Deliver flow logs to S3 as Parquet with hourly Hive-compatible partitions
+            flow_log = ec2.FlowLog(f"{self.base_name}-flow-logs",
+                vpc_id=vpc.vpc_id,
+                traffic_type=args.get("flow_logs_traffic_type", "ALL"),
+                log_destination_type="s3",
+                log_destination=args["flow_logs_bucket_arn"],
+                log_format=" ".join(f"${{{field}}}" for field, _ in FLOW_LOG_FIELDS),
+                max_aggregation_interval=60,
+                destination_options=ec2.FlowLogDestinationOptionsArgs(
+                    file_format="parquet",
+                    hive_compatible_partitions=True,
+                    per_hour_partition=True,
+                ),
+                tags={
+                    **base_tags,
+                    "Name": f"{self.base_name}-flow-logs"
+                },
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+            self.flow_log_id = flow_log.id
+
+            # Create a matching Glue table so flows can be queried from Athena by partition
+            glue_name = self.base_name.lower().replace("-", "_")
+            flow_logs_database = glue.CatalogDatabase(f"{self.base_name}-flow-logs-database",
+                name=f"{glue_name}_network",
+                description=f"Network telemetry for VPC {self.base_name}",
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+            # Bucket ARNs are arn:aws:s3:::<bucket-name>
+            flow_logs_location = pulumi.Output.from_input(args["flow_logs_bucket_arn"]).apply(
+                lambda bucket_arn: f"s3://{bucket_arn.split(':::')[-1]}/AWSLogs/"
+            )
+
+            # Partition projection so Athena finds new hourly partitions without MSCK REPAIR
+            account_id = get_caller_identity(opts=pulumi.InvokeOptions(parent=self)).account_id
+            partition_projection = {
+                "projection.enabled": "true",
+                "projection.aws-account-id.type": "enum",
+                "projection.aws-account-id.values": account_id,
+                "projection.aws-service.type": "enum",
+                "projection.aws-service.values": "vpcflowlogs",
+                "projection.aws-region.type": "enum",
+                "projection.aws-region.values": args["region"],
+                "projection.year.type": "integer",
+                "projection.year.range": "2020,2100",
+                "projection.month.type": "integer",
+                "projection.month.range": "1,12",
+                "projection.month.digits": "2",
+                "projection.day.type": "integer",
+                "projection.day.range": "1,31",
+                "projection.day.digits": "2",
+                "projection.hour.type": "integer",
+                "projection.hour.range": "0,23",
+                "projection.hour.digits": "2",
+                "storage.location.template": flow_logs_location.apply(
+                    lambda location: location + "/".join(
+                        f"{partition}=${{{partition}}}" for partition in FLOW_LOG_PARTITIONS
+                    ) + "/"
+                ),
+            }
+
+            flow_logs_table = glue.CatalogTable(f"{self.base_name}-flow-logs-table",
+                name=f"{glue_name}_flow_logs",
+                database_name=flow_logs_database.name,
+                table_type="EXTERNAL_TABLE",
+                parameters={
+                    "EXTERNAL": "TRUE",
+                    "classification": "parquet",
+                    "parquet.compression": "SNAPPY",
+                    **partition_projection,
+                },
+                partition_keys=[
+                    glue.CatalogTablePartitionKeyArgs(name=partition, type="string")
+                    for partition in FLOW_LOG_PARTITIONS
+                ],
+                storage_descriptor=glue.CatalogTableStorageDescriptorArgs(
+                    location=flow_logs_location,
+                    input_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat",
+                    output_format="org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat",
+                    ser_de_info=glue.CatalogTableStorageDescriptorSerDeInfoArgs(
+                        serialization_library="org.apache.hadoop.hive.ql.io.parquet.serde.ParquetHiveSerDe",
+                    ),
+                    # Parquet flow log columns use underscores in place of hyphens
+                    columns=[
+                        glue.CatalogTableStorageDescriptorColumnArgs(
+                            name=field.replace("-", "_"),
+                            type=column_type
+                        )
+                        for field, column_type in FLOW_LOG_FIELDS
+                    ],
+                ),
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+            self.flow_logs_table_name = pulumi.Output.concat(flow_logs_database.name, ".", flow_logs_table.name)
 
         # Configure the VPC default route table
-        default_route_table = aws.ec2.DefaultRouteTable("defaultRouteTable",
+        default_route_table = ec2.DefaultRouteTable(f"{self.base_name}-default-route-table",
             default_route_table_id=vpc.vpc.default_route_table_id,
             routes=[],
             tags=base_tags,
-            opts=pulumi.ResourceOptions(parent=self)
+            opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases("defaultRouteTable"))
         )
 
         # Configure the VPC default security group
-        default_security_group = aws.ec2.DefaultSecurityGroup("defaultSecurityGroup",
+        default_security_group = ec2.DefaultSecurityGroup(f"{self.base_name}-default-security-group",
             vpc_id=self.vpc_id,
             ingress=[],
             egress=[],
@@ -230,12 +663,78 @@ class Vpc(pulumi.ComponentResource):
                 **base_tags,
                 "Name": f"{self.base_name}-default"
             },
-            opts=pulumi.ResourceOptions(parent=self)
+            opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases("defaultSecurityGroup"))
         )
-        
-        if args.get("open_vpn_vpc_id") is not None:
+
+        self.transit_gateway_attachment_id = None
+
+        if args.get("transit_gateway_id") is not None:
+            # Hub-and-spoke mode, attach to the shared transit gateway instead of peering
+            # Attach through a single tier so there is exactly one ENI per AZ, preferring the isolated subnets
+            tgw_subnet_tier = next((
+                tier for tier in ["isolated-data", "private-app", "private-data"] if tier in self.subnet_ids_by_tier
+            ), None)
+            if tgw_subnet_tier is None:
+                raise ValueError("transit_gateway_id requires isolated_data_subnets, private_app_subnets or private_data_subnets")
+            tgw_subnet_ids = self.subnet_ids_by_tier[tgw_subnet_tier]
+
+            # Disable default association/propagation when explicit route tables are given
+            tgw_route_table_id = args.get("transit_gateway_route_table_id")
+            tgw_propagation_route_table_ids = args.get("transit_gateway_propagation_route_table_ids", [])
+
+            tgw_attachment = ec2transitgateway.VpcAttachment(f"{self.base_name}-tgw-attachment",
+                transit_gateway_id=args["transit_gateway_id"],
+                vpc_id=vpc.vpc_id,
+                subnet_ids=tgw_subnet_ids,
+                dns_support="enable",
+                transit_gateway_default_route_table_association=tgw_route_table_id is None,
+                transit_gateway_default_route_table_propagation=not tgw_propagation_route_table_ids,
+                tags={
+                    **base_tags,
+                    "Name": f"{self.base_name}-tgw"
+                },
+                opts=pulumi.ResourceOptions(parent=self)
+            )
+
+            self.transit_gateway_attachment_id = tgw_attachment.id
+
+            # Associate the attachment with the given transit gateway route table
+            if tgw_route_table_id is not None:
+                ec2transitgateway.RouteTableAssociation(f"{self.base_name}-tgw-association",
+                    transit_gateway_attachment_id=tgw_attachment.id,
+                    transit_gateway_route_table_id=tgw_route_table_id,
+                    opts=pulumi.ResourceOptions(parent=tgw_attachment)
+                )
+
+            # Propagate the VPC CIDR into each given transit gateway route table
+            for i, propagation_route_table_id in enumerate(tgw_propagation_route_table_ids):
+                ec2transitgateway.RouteTablePropagation(f"{self.base_name}-tgw-propagation-{i}",
+                    transit_gateway_attachment_id=tgw_attachment.id,
+                    transit_gateway_route_table_id=propagation_route_table_id,
+                    opts=pulumi.ResourceOptions(parent=tgw_attachment)
+                )
+
+            # Configure local subnet routes, one per summarized CIDR instead of one per peered VPC
+            tgw_cidrs = args.get("transit_gateway_cidrs") or ["10.0.0.0/8"]
+
+            def create_tgw_routes(route_tables):
+                for i, route_table in enumerate(route_tables):
+                    for j, tgw_cidr in enumerate(tgw_cidrs):
+                        route_table.id.apply(
+                            lambda route_table_id, i=i, j=j, tgw_cidr=tgw_cidr: ec2.Route(
+                                f"{args['name']}-{i}-tgw-{j}",
+                                route_table_id=route_table_id,
+                                destination_cidr_block=tgw_cidr,
+                                transit_gateway_id=args["transit_gateway_id"],
+                                opts=pulumi.ResourceOptions(parent=tgw_attachment, depends_on=[tgw_attachment])
+                            )
+                        )
+
+            self.private_route_tables.apply(create_tgw_routes)
+
+        elif args.get("open_vpn_vpc_id") is not None:
             # Create the peering
-            open_vpn_vpc = aws.ec2.VpcPeeringConnection("openVpnVpc",
+            open_vpn_vpc = ec2.VpcPeeringConnection(f"{self.base_name}-open-vpn-peering",
                 peer_vpc_id=args["open_vpn_vpc_id"],
                 vpc_id=vpc.vpc_id,
                 auto_accept=True,
@@ -243,14 +742,14 @@ class Vpc(pulumi.ComponentResource):
                     **base_tags,
                     "Name": f"{self.base_name}-main"
                 },
-                opts=pulumi.ResourceOptions(parent=self)
+                opts=pulumi.ResourceOptions(parent=self, aliases=legacy_aliases("openVpnVpc"))
             )
 
             # Configure local subnet routes
             def create_local_routes(route_tables):
                 for i, route_table in enumerate(route_tables):
                     route_table.id.apply(
-                        lambda route_table_id, i=i: aws.ec2.Route(
+                        lambda route_table_id, i=i: ec2.Route(
                             f"{args['name']}-{i}-main",
                             route_table_id=route_table_id,
                             destination_cidr_block=args["open_vpn_vpc_cidr"],
@@ -272,7 +771,7 @@ class Vpc(pulumi.ComponentResource):
                         else:
                             route_table_id = route_table
 
-                        aws.ec2.Route(f"main-{i}-{args['name']}",
+                        ec2.Route(f"main-{i}-{args['name']}",
                             route_table_id=route_table_id,
                             destination_cidr_block=args["cidr"],
                             vpc_peering_connection_id=open_vpn_vpc.id,
@@ -288,7 +787,13 @@ class Vpc(pulumi.ComponentResource):
             "private_subnet_ids": self.private_subnet_ids,
             "isolated_subnet_ids": self.isolated_subnet_ids,
             "route_tables": self.route_tables,
+            "subnet_plan": self.subnet_plan,
             "private_route_tables": self.private_route_tables,
             "dynamodb_endpoint_id": self.dynamodb_endpoint_id,
             "s3_endpoint_id": self.s3_endpoint_id,
+            "s3_prefix_list_id": self.s3_prefix_list_id,
+            "transit_gateway_attachment_id": self.transit_gateway_attachment_id,
+            "flow_log_id": self.flow_log_id,
+            "flow_logs_table_name": self.flow_logs_table_name,
+            "dashboard_name": self.dashboard_name,
         })
\ No newline at end of file
@@ -0,0 +1,205 @@
+import argparse
+import importlib.util
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, List
+
+from pulumi import automation as auto
+
+from lib.ip_plan import assign_vpc_cidrs
+
+
+PROJECT_NAME = "KY-Workshop-Python"
+PROGRAM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__main__.py")
+
+
+def load_program():
+    # __main__.py can't be imported by name, so load it from its path
+    spec = importlib.util.spec_from_file_location("workshop_program", PROGRAM_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.main
+
+
+def stored_cidrs(backend: str) -> Dict[str, str]:
+    # vpcCidr each existing stack was last configured with, so re-runs never move an allocated VPC
+    workspace = auto.LocalWorkspace(project_settings=auto.ProjectSettings(
+        name=PROJECT_NAME,
+        runtime="python",
+        backend=auto.ProjectBackend(url=backend),
+    ))
+
+    existing = {}
+    for summary in workspace.list_stacks():
+        try:
+            existing[summary.name.split("/")[-1]] = workspace.get_config(summary.name, "vpcCidr").value
+        except auto.CommandError:
+            # Stack without a vpcCidr, e.g. one that was created but never configured
+            continue
+    return existing
+
+
+def assign_cidrs(roster: List[Dict[str, Any]], pool: str, prefix: int, reserved: List[str],
+                 existing: Dict[str, str]) -> List[Dict[str, Any]]:
+    # Two workers must never deploy the same stack at once
+    names = [entry["name"] for entry in roster]
+    duplicates = sorted({stack_name for stack_name in names if names.count(stack_name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate stack names in roster: {', '.join(duplicates)}")
+
+    # Keep explicit CIDRs, then the CIDR each stack is already deployed with, and allocate the rest
+    explicit = {entry["name"]: entry["vpcCidr"] for entry in roster if entry.get("vpcCidr")}
+    assigned = assign_vpc_cidrs(names, explicit, existing, pool, prefix, reserved)
+
+    for entry in roster:
+        entry["vpcCidr"] = assigned[entry["name"]]
+
+    return roster
+
+
+def run_stack(entry: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
+    stack_name = entry["name"]
+    log_path = os.path.join(settings["log_dir"], f"{stack_name}.log")
+
+    result = {"stack": stack_name, "vpcCidr": entry["vpcCidr"], "status": "failed", "attempts": 0}
+    started = time.monotonic()
+
+    with open(log_path, "a") as log:
+        def on_output(line):
+            log.write(f"{line}\n")
+            log.flush()
+
+        for attempt in range(1, settings["retries"] + 2):
+            result["attempts"] = attempt
+            log.write(f"--- {settings['operation']} attempt {attempt} ---\n")
+
+            try:
+                stack = auto.create_or_select_stack(
+                    stack_name=stack_name,
+                    project_name=PROJECT_NAME,
+                    program=load_program(),
+                    opts=auto.LocalWorkspaceOptions(
+                        project_settings=auto.ProjectSettings(
+                            name=PROJECT_NAME,
+                            runtime="python",
+                            backend=auto.ProjectBackend(url=settings["backend"]),
+                        ),
+                    ),
+                )
+
+                stack.set_all_config({
+                    "aws:region": auto.ConfigValue(settings["region"]),
+                    "namespace": auto.ConfigValue(entry.get("namespace", settings["namespace"])),
+                    "environment": auto.ConfigValue(entry.get("environment", settings["environment"])),
+                    "name": auto.ConfigValue(entry["name"]),
+                    "openVpnStack": auto.ConfigValue(settings["open_vpn_stack"]),
+                    "vpcCidr": auto.ConfigValue(entry["vpcCidr"]),
+                })
+
+                if settings["operation"] == "preview":
+                    outcome = stack.preview(on_output=on_output)
+                    result["changes"] = outcome.change_summary
+                elif settings["operation"] == "destroy":
+                    outcome = stack.destroy(on_output=on_output)
+                    result["changes"] = outcome.summary.resource_changes
+                else:
+                    outcome = stack.up(on_output=on_output)
+                    result["changes"] = outcome.summary.resource_changes
+
+                result["status"] = "succeeded"
+                break
+            except Exception as e:
+                log.write(f"{type(e).__name__}: {e}\n")
+                result["error"] = f"{type(e).__name__}: {str(e).splitlines()[0] if str(e) else ''}"
+
+                if attempt <= settings["retries"]:
+                    time.sleep(settings["retry_delay"] * attempt)
+
+    result["duration"] = round(time.monotonic() - started, 1)
+    return result
+
+
+def format_summary(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'STACK':<24} {'CIDR':<16} {'STATUS':<10} {'ATTEMPTS':>8} {'SECONDS':>8}  CHANGES"]
+    for result in sorted(results, key=lambda r: r["stack"]):
+        changes = result.get("changes") or result.get("error", "")
+        if isinstance(changes, dict):
+            changes = ", ".join(f"{op}={count}" for op, count in sorted(changes.items()))
+        lines.append(
+            f"{result['stack']:<24} {result['vpcCidr']:<16} {result['status']:<10} "
+            f"{result['attempts']:>8} {result['duration']:>8}  {changes}"
+        )
+
+    succeeded = sum(1 for result in results if result["status"] == "succeeded")
+    lines.append(f"{succeeded}/{len(results)} stacks succeeded")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy the workshop program to many stacks in parallel")
+    parser.add_argument("roster", help="JSON file with a list of {name, namespace, vpcCidr} entries (vpcCidr optional)")
+    parser.add_argument("--operation", choices=["preview", "up", "destroy"], default="preview")
+    parser.add_argument("--backend", default=f"file://{os.path.abspath('.pulumi-state')}",
+                        help="Pulumi state backend URL (defaults to a local file backend)")
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--namespace", default="huckstream", help="Default namespace for entries without one")
+    parser.add_argument("--environment", default="wksp")
+    parser.add_argument("--open-vpn-stack", default="HuckStream/KY-Workshop-Prep/main")
+    parser.add_argument("--cidr-pool", default="10.0.0.0/8", help="Pool to allocate missing vpcCidr values from")
+    parser.add_argument("--cidr-prefix", type=int, default=16)
+    parser.add_argument("--reserved-cidr", action="append", default=[],
+                        help="CIDR to never allocate, e.g. the OpenVPN VPC (repeatable)")
+    parser.add_argument("--parallel", type=int, default=4, help="Maximum stacks deployed at once")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--retry-delay", type=float, default=10.0, help="Seconds, multiplied by the attempt number")
+    parser.add_argument("--log-dir", default="logs")
+    cli_args = parser.parse_args()
+
+    if cli_args.backend.startswith("file://"):
+        # The file backend encrypts stack secrets (e.g. the database admin password) with the passphrase
+        if not (os.environ.get("PULUMI_CONFIG_PASSPHRASE") or os.environ.get("PULUMI_CONFIG_PASSPHRASE_FILE")):
+            parser.exit(1, "error: set PULUMI_CONFIG_PASSPHRASE or PULUMI_CONFIG_PASSPHRASE_FILE for a file backend\n")
+        os.makedirs(cli_args.backend[len("file://"):], exist_ok=True)
+    os.makedirs(cli_args.log_dir, exist_ok=True)
+
+    with open(cli_args.roster) as f:
+        try:
+            roster = assign_cidrs(json.load(f), cli_args.cidr_pool, cli_args.cidr_prefix, cli_args.reserved_cidr,
+                                  stored_cidrs(cli_args.backend))
+        except ValueError as e:
+            parser.exit(1, f"error: {e}\n")
+
+    settings = {
+        "operation": cli_args.operation,
+        "backend": cli_args.backend,
+        "region": cli_args.region,
+        "namespace": cli_args.namespace,
+        "environment": cli_args.environment,
+        "open_vpn_stack": cli_args.open_vpn_stack,
+        "retries": cli_args.retries,
+        "retry_delay": cli_args.retry_delay,
+        "log_dir": cli_args.log_dir,
+    }
+
+    # Inline programs run in the calling process, so each stack gets its own worker process
+    results = []
+    with ProcessPoolExecutor(max_workers=cli_args.parallel) as executor:
+        futures = [executor.submit(run_stack, entry, settings) for entry in roster]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"{result['stack']}: {result['status']} after {result['attempts']} attempt(s)")
+            results.append(result)
+
+    print(format_summary(results))
+
+    with open(os.path.join(cli_args.log_dir, "summary.json"), "w") as f:
+        json.dump(results, f, indent=2, default=str)
+
+    if any(result["status"] != "succeeded" for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
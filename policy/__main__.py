@@ -0,0 +1,46 @@
+from pulumi_policy import (
+    EnforcementLevel,
+    PolicyConfigSchema,
+    PolicyPack,
+    StackValidationArgs,
+    StackValidationPolicy,
+)
+
+from rules import RULES
+
+
+def to_graph(args: StackValidationArgs):
+    return [
+        {
+            "type": resource.resource_type,
+            "urn": resource.urn,
+            "name": resource.name,
+            "props": resource.props,
+            "parent": resource.parent.urn if resource.parent else None,
+        }
+        for resource in args.resources
+    ]
+
+
+def make_policy(name, description, enforcement_level, check, config_properties):
+    def validate(args: StackValidationArgs, report_violation):
+        for violation in check(to_graph(args), args.get_config()):
+            report_violation(violation)
+
+    return StackValidationPolicy(
+        name=name,
+        description=description,
+        enforcement_level=EnforcementLevel(enforcement_level),
+        config_schema=PolicyConfigSchema(properties=config_properties),
+        validate=validate,
+    )
+
+
+PolicyPack(
+    name="huckstream-performance",
+    enforcement_level=EnforcementLevel.ADVISORY,
+    policies=[
+        make_policy(name, *rule)
+        for name, rule in RULES.items()
+    ],
+)
@@ -0,0 +1,184 @@
+import json
+import sys
+from typing import Optional, List, Dict, Any
+
+
+# A resource in the graph is a dict of {"type", "urn", "name", "props", "parent"} where parent is
+# the parent URN, so rules can run against a live stack or a mocked graph loaded from JSON
+
+COMPONENT_PREFIX = "huckstream:aws:"
+
+
+def component_ancestor(resource: Dict[str, Any], by_urn: Dict[str, Dict[str, Any]],
+                       component_type: str) -> Optional[Dict[str, Any]]:
+    parent = by_urn.get(resource.get("parent"))
+    while parent is not None:
+        if parent["type"] == component_type:
+            return parent
+        parent = by_urn.get(parent.get("parent"))
+    return None
+
+
+def children_of(resources: List[Dict[str, Any]], component_type: str, resource_type: str):
+    """Yield (component, resource) for every resource_type descended from a component_type component."""
+    by_urn = {resource["urn"]: resource for resource in resources}
+    for resource in resources:
+        if resource["type"] != resource_type:
+            continue
+        component = component_ancestor(resource, by_urn, component_type)
+        if component is not None:
+            yield component, resource
+
+
+def _first(value):
+    # Nested blocks come through as a dict or a single-element list depending on the provider version
+    if isinstance(value, list):
+        return value[0] if value else {}
+    return value or {}
+
+
+def check_ping_instance_type(resources: List[Dict[str, Any]], config: Dict[str, Any]) -> List[str]:
+    disallowed_families = config.get("disallowedInstanceFamilies", ["t2"])
+
+    violations = []
+    for component, instance in children_of(resources, f"{COMPONENT_PREFIX}pingback", "aws:ec2/instance:Instance"):
+        instance_type = instance["props"].get("instanceType", "")
+        if instance_type.split(".")[0] in disallowed_families:
+            violations.append(
+                f"{component['name']}: instance type {instance_type} is from a previous-generation family "
+                f"({', '.join(disallowed_families)}), use a current-generation type such as t3 or t4g"
+            )
+    return violations
+
+
+def check_vpc_nat_redundancy(resources: List[Dict[str, Any]], config: Dict[str, Any]) -> List[str]:
+    min_nat_gateways = config.get("minNatGateways", 2)
+
+    nat_counts = {}
+    for component, _ in children_of(resources, f"{COMPONENT_PREFIX}vpc", "aws:ec2/natGateway:NatGateway"):
+        nat_counts[component["urn"]] = nat_counts.get(component["urn"], 0) + 1
+
+    by_urn = {resource["urn"]: resource for resource in resources}
+    return [
+        f"{by_urn[urn]['name']}: {count} NAT gateway(s) carry all private egress, "
+        f"at least {min_nat_gateways} spread across AZs avoids a cross-AZ bottleneck (nat_gateway_strategy ONE_PER_AZ)"
+        for urn, count in nat_counts.items() if count < min_nat_gateways
+    ]
+
+
+def check_bucket_key(resources: List[Dict[str, Any]], config: Dict[str, Any]) -> List[str]:
+    sse_algorithms = config.get("sseAlgorithms", ["aws:kms", "aws:kms:dsse"])
+
+    violations = []
+    for component, bucket in children_of(resources, f"{COMPONENT_PREFIX}encrypted-bucket", "aws:s3/bucket:Bucket"):
+        rule = _first(_first(bucket["props"].get("serverSideEncryptionConfiguration")).get("rule"))
+        algorithm = _first(rule.get("applyServerSideEncryptionByDefault")).get("sseAlgorithm")
+        if algorithm in sse_algorithms and not rule.get("bucketKeyEnabled"):
+            violations.append(
+                f"{component['name']}: bucket uses {algorithm} without an S3 bucket key, "
+                f"every object request calls KMS and is subject to KMS request quotas"
+            )
+    return violations
+
+
+def check_aurora_parameter_groups(resources: List[Dict[str, Any]], config: Dict[str, Any]) -> List[str]:
+    min_parameters = config.get("minParameters", 1)
+
+    violations = []
+    for resource_type in ["aws:rds/clusterParameterGroup:ClusterParameterGroup", "aws:rds/parameterGroup:ParameterGroup"]:
+        for component, parameter_group in children_of(resources, f"{COMPONENT_PREFIX}postgres", resource_type):
+            parameters = parameter_group["props"].get("parameters") or []
+            if len(parameters) < min_parameters:
+                violations.append(
+                    f"{component['name']}: {parameter_group['name']} overrides {len(parameters)} parameter(s), "
+                    f"at least {min_parameters} expected (e.g. shared_preload_libraries, work_mem)"
+                )
+    return violations
+
+
+def check_aurora_performance_insights(resources: List[Dict[str, Any]], config: Dict[str, Any]) -> List[str]:
+    min_retention_days = config.get("minRetentionDays", 7)
+
+    violations = []
+    for component, instance in children_of(resources, f"{COMPONENT_PREFIX}postgres", "aws:rds/clusterInstance:ClusterInstance"):
+        props = instance["props"]
+        # Unset means the free tier, which keeps 7 days
+        retention_days = props.get("performanceInsightsRetentionPeriod") or 7
+        if not props.get("performanceInsightsEnabled"):
+            violations.append(f"{component['name']}: {instance['name']} does not enable Performance Insights")
+        elif retention_days < min_retention_days:
+            violations.append(
+                f"{component['name']}: {instance['name']} keeps Performance Insights for "
+                f"{retention_days} days, at least {min_retention_days} expected"
+            )
+    return violations
+
+
+# name -> (description, default enforcement level, check, config schema properties)
+RULES = {
+    "ping-instance-current-generation": (
+        "Ping instances should use current-generation instance types.",
+        "advisory",
+        check_ping_instance_type,
+        {"disallowedInstanceFamilies": {"type": "array", "items": {"type": "string"}, "default": ["t2"]}},
+    ),
+    "vpc-nat-gateway-redundancy": (
+        "VPCs with private subnets should not route all egress through a single NAT gateway "
+        "(set nat_gateway_strategy to ONE_PER_AZ on the Vpc).",
+        "advisory",
+        check_vpc_nat_redundancy,
+        {"minNatGateways": {"type": "integer", "default": 2}},
+    ),
+    "encrypted-bucket-bucket-key": (
+        "KMS-encrypted buckets must enable S3 bucket keys.",
+        "mandatory",
+        check_bucket_key,
+        {"sseAlgorithms": {"type": "array", "items": {"type": "string"}, "default": ["aws:kms", "aws:kms:dsse"]}},
+    ),
+    "aurora-tuned-parameter-groups": (
+        "Aurora parameter groups should override the engine defaults.",
+        "advisory",
+        check_aurora_parameter_groups,
+        {"minParameters": {"type": "integer", "default": 1}},
+    ),
+    "aurora-performance-insights": (
+        "Aurora instances should enable Performance Insights.",
+        "advisory",
+        check_aurora_performance_insights,
+        {"minRetentionDays": {"type": "integer", "default": 7}},
+    ),
+}
+
+
+def check_graph(resources: List[Dict[str, Any]], config: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, List[str]]:
+    """Run every rule against a resource graph, returning rule name -> violations."""
+    config = config or {}
+    return {
+        name: check(resources, config.get(name, {}))
+        for name, (_, _, check, _) in RULES.items()
+    }
+
+
+def main():
+    # Check a mocked or exported graph offline: python policy/rules.py graph.json [config.json]
+    with open(sys.argv[1]) as f:
+        resources = json.load(f)
+
+    config = {}
+    if len(sys.argv) > 2:
+        with open(sys.argv[2]) as f:
+            config = json.load(f)
+
+    failed = False
+    for name, violations in check_graph(resources, config).items():
+        enforcement_level = RULES[name][1]
+        for violation in violations:
+            print(f"[{enforcement_level}] {name}: {violation}")
+            failed = failed or enforcement_level == "mandatory"
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
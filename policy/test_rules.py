@@ -0,0 +1,131 @@
+from rules import (
+    check_aurora_parameter_groups,
+    check_aurora_performance_insights,
+    check_bucket_key,
+    check_graph,
+    check_ping_instance_type,
+    check_vpc_nat_redundancy,
+)
+
+
+def component(component_type, name):
+    return {
+        "type": f"huckstream:aws:{component_type}",
+        "urn": f"urn:pulumi:test::workshop::huckstream:aws:{component_type}::{name}",
+        "name": name,
+        "props": {},
+        "parent": None,
+    }
+
+
+def child(parent, resource_type, name, props):
+    return {
+        "type": resource_type,
+        "urn": f"{parent['urn']}${resource_type}::{name}",
+        "name": name,
+        "props": props,
+        "parent": parent["urn"],
+    }
+
+
+def test_ping_instance_type():
+    ping = component("pingback", "ping")
+    resources = [
+        ping,
+        child(ping, "aws:ec2/instance:Instance", "old", {"instanceType": "t2.micro"}),
+        child(ping, "aws:ec2/instance:Instance", "new", {"instanceType": "t3.micro"}),
+    ]
+
+    violations = check_ping_instance_type(resources, {})
+    assert len(violations) == 1
+    assert "t2.micro" in violations[0]
+
+
+def test_vpc_nat_redundancy():
+    single = component("vpc", "single")
+    redundant = component("vpc", "redundant")
+    # NAT gateways are nested under the awsx Vpc, not directly under the component
+    awsx_vpc = child(redundant, "awsx:ec2:Vpc", "redundant", {})
+    resources = [
+        single,
+        redundant,
+        awsx_vpc,
+        child(single, "aws:ec2/natGateway:NatGateway", "nat-1", {}),
+        child(awsx_vpc, "aws:ec2/natGateway:NatGateway", "nat-1", {}),
+        child(awsx_vpc, "aws:ec2/natGateway:NatGateway", "nat-2", {}),
+    ]
+
+    assert check_vpc_nat_redundancy(resources, {}) == [
+        "single: 1 NAT gateway(s) carry all private egress, at least 2 spread across AZs avoids a cross-AZ bottleneck "
+        "(nat_gateway_strategy ONE_PER_AZ)"
+    ]
+    assert check_vpc_nat_redundancy(resources, {"minNatGateways": 1}) == []
+
+
+def test_bucket_key():
+    logs = component("encrypted-bucket", "logs")
+
+    def bucket(name, bucket_key_enabled):
+        return child(logs, "aws:s3/bucket:Bucket", name, {
+            "serverSideEncryptionConfiguration": {
+                "rule": {
+                    "applyServerSideEncryptionByDefault": {"sseAlgorithm": "aws:kms"},
+                    "bucketKeyEnabled": bucket_key_enabled,
+                },
+            },
+        })
+
+    resources = [logs, bucket("without-key", False), bucket("with-key", True)]
+
+    violations = check_bucket_key(resources, {})
+    assert len(violations) == 1
+    assert "without an S3 bucket key" in violations[0]
+
+
+def test_aurora_parameter_groups():
+    db = component("postgres", "db")
+    resources = [
+        db,
+        child(db, "aws:rds/clusterParameterGroup:ClusterParameterGroup", "db-cpg", {"parameters": []}),
+        child(db, "aws:rds/parameterGroup:ParameterGroup", "db-pg", {
+            "parameters": [{"name": "work_mem", "value": "65536"}],
+        }),
+    ]
+
+    violations = check_aurora_parameter_groups(resources, {})
+    assert len(violations) == 1
+    assert "db-cpg" in violations[0]
+
+
+def test_aurora_performance_insights():
+    db = component("postgres", "db")
+    resources = [
+        db,
+        child(db, "aws:rds/clusterInstance:ClusterInstance", "db-1", {"performanceInsightsEnabled": False}),
+        child(db, "aws:rds/clusterInstance:ClusterInstance", "db-2", {
+            "performanceInsightsEnabled": True,
+            "performanceInsightsRetentionPeriod": 731,
+        }),
+        # Retention left unset falls back to the 7 day free tier
+        child(db, "aws:rds/clusterInstance:ClusterInstance", "db-3", {"performanceInsightsEnabled": True}),
+    ]
+
+    assert check_aurora_performance_insights(resources, {}) == [
+        "db: db-1 does not enable Performance Insights",
+    ]
+    assert check_aurora_performance_insights(resources, {"minRetentionDays": 731}) == [
+        "db: db-1 does not enable Performance Insights",
+        "db: db-3 keeps Performance Insights for 7 days, at least 731 expected",
+    ]
+
+
+def test_check_graph_runs_every_rule():
+    results = check_graph([])
+    assert set(results) == {
+        "ping-instance-current-generation",
+        "vpc-nat-gateway-redundancy",
+        "encrypted-bucket-bucket-key",
+        "aurora-tuned-parameter-groups",
+        "aurora-performance-insights",
+    }
+    assert all(violations == [] for violations in results.values())
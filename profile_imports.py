@@ -0,0 +1,98 @@
+import argparse
+import json
+import subprocess
+import sys
+from typing import Dict, Any, List
+
+
+# Modules loaded on a typical preview, in the order the program pulls them in
+DEFAULT_MODULES = [
+    "pulumi",
+    "lib.vpc",
+    "lib.ping_instance",
+    "lib.encrypted_bucket",
+    "lib.aurora_postgres",
+    "pulumi_aws",
+    "pulumi_aws.ec2",
+    "pulumi_awsx",
+    "pulumi_random",
+]
+
+# Runs in a fresh interpreter so each measurement starts from a clean module cache
+PROBE = """
+import importlib, json, resource, sys, time
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+baseline = sys.argv[1]
+target = sys.argv[2]
+
+if baseline:
+    importlib.import_module(baseline)
+
+before_modules = len(sys.modules)
+before_rss = rss_kb()
+started = time.perf_counter()
+importlib.import_module(target)
+elapsed = time.perf_counter() - started
+
+print(json.dumps({
+    "module": target,
+    "seconds": elapsed,
+    "rss_kb": rss_kb() - before_rss,
+    "modules_loaded": len(sys.modules) - before_modules,
+}))
+"""
+
+
+def measure(module: str, baseline: str) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE, baseline, module],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "import failed"
+        return {"module": module, "error": error}
+
+    return json.loads(completed.stdout)
+
+
+def format_report(results: List[Dict[str, Any]], baseline: str) -> str:
+    lines = [f"Import cost on top of '{baseline or 'interpreter'}' (fresh process per module)",
+             f"{'MODULE':<28} {'SECONDS':>8} {'RSS MB':>8} {'MODULES':>8}"]
+    for result in results:
+        if "error" in result:
+            lines.append(f"{result['module']:<28} {result['error']}")
+        else:
+            lines.append(
+                f"{result['module']:<28} {result['seconds']:>8.3f} "
+                f"{result['rss_kb'] / 1024:>8.1f} {result['modules_loaded']:>8}"
+            )
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the time and memory each module adds at program startup")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--baseline", default="pulumi",
+                        help="Module imported before measuring, so its cost is excluded (empty for none)")
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    cli_args = parser.parse_args()
+
+    baseline = cli_args.baseline
+    results = [measure(module, baseline if module != baseline else "") for module in cli_args.modules]
+
+    if cli_args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(format_report(results, baseline))
+
+
+if __name__ == "__main__":
+    main()